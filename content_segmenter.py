@@ -6,153 +6,313 @@ Extracts full text content for each heading identified in the Round 1A outline.
 
 import fitz  # PyMuPDF
 import json
+import numpy as np
 import os
+import multiprocessing
+from itertools import groupby, islice
+from operator import itemgetter
 from typing import List, Dict, Any, Tuple
 import re
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    import ahocorasick  # pyahocorasick
+except ImportError:
+    # Optional: fall back to a single compiled regex when the automaton is unavailable
+    ahocorasick = None
+
+try:
+    import orjson
+except ImportError:
+    # Optional: fall back to the standard library parser
+    orjson = None
+
+_span_text = itemgetter('text')
+
+# Runs of non-empty lines, i.e. the paragraphs of str.split('\n\n') without materializing them all
+_PARAGRAPH_RE = re.compile(r"[^\n]+(?:\n[^\n]+)*")
+
+# Extraction flags shared by every get_text call: keep ligatures and whitespace as-is, clip
+# to the mediabox and emit glyph CIDs for characters without a Unicode mapping, without
+# image placeholders (the same set as fitz.TEXTFLAGS_TEXT, so extracted text is unchanged)
+_TEXT_FLAGS = (fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+               | fitz.TEXT_CID_FOR_UNKNOWN_UNICODE)
+
+def load_outline(outline_path: str) -> Dict[str, Any]:
+    """Read a Round 1A outline JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        with open(outline_path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(outline_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@lru_cache(maxsize=4096)
+def _is_valid_heading(line_text: str, negative_re: re.Pattern) -> bool:
+    """Heading check behind ContentSegmenter.is_valid_heading, memoized at module level."""
+    if not line_text.strip() or len(line_text) > 200:
+        return False
+    return negative_re.search(line_text) is None
 
 class ContentSegmenter:
     """Extracts content for each section based on heading boundaries."""
     
     def __init__(self):
-        self.negative_keywords = [
+        self.negative_keywords = (
             'figure', 'table', 'university', 'department', 'institute',
             'inc.', 'llc', 'copyright', 'issn', 'editor', 'author',
             'reviewed by', 'letter from', 'in this issue', 'continued', 'www.'
+        )
+        # Negative keywords and email addresses, matched in a single regex pass
+        self._negative_re = re.compile(
+            "|".join(map(re.escape, self.negative_keywords)) + r"|\S+@\S+", re.IGNORECASE
+        )
+        # Topic keywords that mark a line as a heading when no outline is available
+        self.heading_keywords = [
+            'guide', 'activities', 'tips', 'cuisine', 'history', 'culture', 
+            'restaurants', 'hotels', 'cities', 'coastal', 'adventures',
+            'packing', 'nightlife', 'entertainment', 'overview', 'introduction'
         ]
+        self._heading_keyword_re = re.compile("|".join(map(re.escape, self.heading_keywords)), re.IGNORECASE)
+        # Upper bound on content gathered per section when no outline is available
+        self.max_section_chars = 10000
     
     def is_valid_heading(self, line_text: str) -> bool:
         """Check if a line is a valid heading."""
-        text_lower = line_text.lower()
-        if not text_lower.strip() or len(text_lower) > 200:
-            return False
-        if any(keyword in text_lower for keyword in self.negative_keywords):
-            return False
-        if re.search(r'\S+@\S+', text_lower):
-            return False
-        return True
+        # Outlines repeat headings (each next heading is checked again as the current one),
+        # so the check is memoized, keyed on the compiled negative-keyword pattern
+        return _is_valid_heading(line_text, self._negative_re)
     
-    def find_heading_bbox(self, page: fitz.Page, heading_text: str) -> Tuple[float, float]:
-        """Find the bounding box coordinates of a heading on a page."""
-        try:
-            # Search for the heading text on the page
-            rect_list = page.search_for(heading_text)
-            if rect_list:
-                # Return the first (highest) occurrence
-                rect = rect_list[0]
-                return rect.y0, rect.y1  # top and bottom coordinates
-            return None, None
-        except Exception:
-            return None, None
+    def _compute_heading_ys(self, blocks: list, headings_on_page: List[str]) -> Dict[str, Tuple[float, float]]:
+        """Locate the first (highest) occurrence of each heading in one sweep of the page blocks."""
+        # Match case- and whitespace-insensitively, like page.search_for
+        pending = {heading: "".join(heading.lower().split()) for heading in headings_on_page}
+        pending = {heading: key for heading, key in pending.items() if key}
+        heading_ys = {}
+        
+        for block in blocks:
+            if not pending:
+                break
+            if block["type"] != 0:  # Text blocks only
+                continue
+            
+            line_keys = []
+            for line in block["lines"]:
+                spans = line['spans']
+                line_text = spans[0]['text'] if len(spans) == 1 else "".join(map(_span_text, spans))
+                line_key = "".join(line_text.lower().split())
+                line_keys.append(line_key)
+                for heading, key in list(pending.items()):
+                    if key in line_key:
+                        heading_ys[heading] = (line["bbox"][1], line["bbox"][3])
+                        del pending[heading]
+            
+            # Headings wrapped over several lines only match the joined block text
+            block_key = "".join(line_keys)
+            for heading, key in list(pending.items()):
+                if key in block_key:
+                    heading_ys[heading] = (block["bbox"][1], block["bbox"][3])
+                    del pending[heading]
+        
+        return heading_ys
     
-    def extract_text_in_range(self, page: fitz.Page, start_y: float, end_y: float) -> str:
-        """Extract text within a vertical range on a page."""
+    def _find_heading_offsets(self, content: str, headings: List[str]) -> Dict[str, List[int]]:
+        """Collect the sorted start offsets of every heading occurrence in one scan of the content."""
+        offsets = {heading: [] for heading in headings if heading}
+        if not offsets:
+            return offsets
+        
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for heading in offsets:
+                automaton.add_word(heading, heading)
+            automaton.make_automaton()
+            for end_idx, heading in automaton.iter(content):
+                offsets[heading].append(end_idx - len(heading) + 1)
+        else:
+            # Longest alternative first, so each position reports its longest heading;
+            # any shorter heading starting at the same position is a prefix of it
+            ordered = sorted(offsets, key=len, reverse=True)
+            pattern = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))")
+            prefixes = {heading: [other for other in ordered if other != heading and heading.startswith(other)]
+                        for heading in ordered}
+            for match in pattern.finditer(content):
+                longest = match.group(1)
+                offsets[longest].append(match.start())
+                for prefix in prefixes[longest]:
+                    offsets[prefix].append(match.start())
+        
+        return offsets
+    
+    def _page_has_text(self, page: fitz.Page) -> bool:
+        """Cheaply rule out image-only pages: no font resources means nothing to extract."""
+        if not page.parent.is_pdf:
+            return True
+        return bool(page.get_fonts())
+    
+    def _text_blocks(self, line_blocks: list) -> list:
+        """
+        Reduce "dict" blocks to (x0, y0, x1, y1, text, block_no, block_type) text block tuples.
+        
+        The text joins each line's spans with a space and the stripped, non-empty lines with
+        a space, exactly as section content has always been read, so ranges only need one join.
+        """
+        blocks = []
+        for block in line_blocks:
+            if block["type"] != 0:  # Text blocks only
+                continue
+            lines = (" ".join(map(_span_text, line['spans'])).strip() for line in block["lines"])
+            blocks.append((*block["bbox"], " ".join(filter(None, lines)), block["number"], 0))
+        return blocks
+    
+    def _build_page_layout(self, blocks: list, page_height: float) -> Tuple[list, np.ndarray, float]:
+        """Bundle text block tuples with their (y0, y1) extents and the page height."""
+        block_ys = np.array([(block[1], block[3]) for block in blocks], dtype=np.float64).reshape(-1, 2)
+        return blocks, block_ys, page_height
+    
+    def _get_page_layout(self, doc: fitz.Document, page_num: int,
+                         cache: Dict[int, Tuple[list, np.ndarray, float]]) -> Tuple[list, np.ndarray, float]:
+        """Return the sorted text blocks, their (y0, y1) extents and the page height, parsing each page only once."""
+        if page_num not in cache:
+            page = doc[page_num]
+            if self._page_has_text(page):
+                blocks = self._text_blocks(page.get_text("dict", sort=True, flags=_TEXT_FLAGS)["blocks"])
+            else:
+                blocks = []
+            cache[page_num] = self._build_page_layout(blocks, page.rect.height)
+        return cache[page_num]
+    
+    def extract_text_in_range(self, blocks: list, block_ys: np.ndarray, start_y: float, end_y: float) -> str:
+        """Extract text within a vertical range from a page's text blocks."""
         try:
-            # Get text dictionary with sorted blocks
-            text_dict = page.get_text("dict", sort=True, flags=fitz.TEXTFLAGS_TEXT)
-            extracted_text = []
+            # Select blocks overlapping our vertical range in one vectorized comparison
+            in_range = np.flatnonzero((block_ys[:, 1] >= start_y) & (block_ys[:, 0] <= end_y))
             
-            for block in text_dict["blocks"]:
-                if block["type"] == 0:  # Text block
-                    block_bbox = block["bbox"]
-                    block_y0, block_y1 = block_bbox[1], block_bbox[3]
-                    
-                    # Check if block is within our vertical range
-                    if start_y <= block_y1 and block_y0 <= end_y:
-                        for line in block["lines"]:
-                            line_text = " ".join(span['text'] for span in line['spans']).strip()
-                            if line_text:
-                                extracted_text.append(line_text)
-            
-            return " ".join(extracted_text)
+            # Block text is already flattened to its lines; blocks without text are skipped
+            return " ".join(filter(None, (blocks[idx][4] for idx in in_range)))
         except Exception as e:
             print(f"Error extracting text: {e}")
             return ""
     
-    def extract_section_content(self, pdf_path: str, outline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Extract content for each section based on the outline."""
+    def extract_section_content(self, doc: fitz.Document, outline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Extract content for each section of an open document based on the outline."""
         extracted_sections = []
         
         try:
-            with fitz.open(pdf_path) as doc:
-                for i, section in enumerate(outline):
-                    if not self.is_valid_heading(section['text']):
-                        continue
-                    
-                    section_content = []
-                    current_page = section['page']
-                    
-                    # Find the next section to determine content boundaries
-                    next_section = None
-                    if i + 1 < len(outline):
-                        next_section = outline[i + 1]
-                    
-                    # Extract content from current page
-                    page = doc[current_page]
-                    heading_y0, heading_y1 = self.find_heading_bbox(page, section['text'])
+            doc_name = os.path.basename(doc.name)
+            page_count = len(doc)
+            
+            # Parsed blocks, block extents and height per page, shared by every heading on that page
+            page_cache = {}
+            
+            # Locate every outline heading with a single sweep per page
+            heading_ys = {}
+            for page_num, sections_on_page in groupby(sorted(outline, key=itemgetter('page')), key=itemgetter('page')):
+                if 0 <= page_num < page_count:
+                    # The heading sweep needs line-level bboxes, so it reads the "dict" blocks directly
+                    page = doc[page_num]
+                    if self._page_has_text(page):
+                        line_blocks = page.get_text("dict", sort=True, flags=_TEXT_FLAGS)["blocks"]
+                    else:
+                        line_blocks = []
+                    headings_on_page = [s['text'] for s in sections_on_page]
+                    heading_ys[page_num] = self._compute_heading_ys(line_blocks, headings_on_page)
                     
-                    if heading_y0 is not None:
-                        # Determine end boundary for current page
-                        if next_section and next_section['page'] == current_page:
-                            # Next section is on same page
-                            next_y0, _ = self.find_heading_bbox(page, next_section['text'])
-                            end_y = next_y0 if next_y0 else page.rect.height
-                        else:
-                            # Next section is on different page or this is the last section
-                            end_y = page.rect.height
-                        
-                        # Extract text from current page
-                        page_content = self.extract_text_in_range(page, heading_y1, end_y)
-                        if page_content.strip():
-                            section_content.append(page_content)
+                    # Derive the page's block tuples from the same parse instead of extracting it again
+                    page_cache[page_num] = self._build_page_layout(self._text_blocks(line_blocks), page.rect.height)
+            
+            # Resolve each outline entry once; entry i + 1 serves as both "next" and "current" heading
+            section_ys = [heading_ys.get(entry['page'], {}).get(entry['text'], (None, None)) for entry in outline]
+            
+            for i, section in enumerate(outline):
+                heading_text = section['text']
+                if not self.is_valid_heading(heading_text):
+                    continue
+                
+                section_content = []
+                current_page = section['page']
+                
+                # Find the next section to determine content boundaries
+                next_section = None
+                if i + 1 < len(outline):
+                    next_section = outline[i + 1]
+                    next_page = next_section['page']
+                
+                # Extract content from current page
+                heading_y0, heading_y1 = section_ys[i]
+                
+                if heading_y0 is not None:
+                    blocks, block_ys, page_height = self._get_page_layout(doc, current_page, page_cache)
                     
-                    # Extract content from subsequent pages until next section
-                    if next_section:
-                        for page_num in range(current_page + 1, next_section['page']):
-                            if page_num < len(doc):
-                                page = doc[page_num]
-                                page_content = self.extract_text_in_range(page, 0, page.rect.height)
-                                if page_content.strip():
-                                    section_content.append(page_content)
-                        
-                        # Extract content from the page with next section (up to next section)
-                        if next_section['page'] < len(doc):
-                            page = doc[next_section['page']]
-                            next_y0, _ = self.find_heading_bbox(page, next_section['text'])
-                            if next_y0:
-                                page_content = self.extract_text_in_range(page, 0, next_y0)
-                                if page_content.strip():
-                                    section_content.append(page_content)
+                    # Determine end boundary for current page
+                    if next_section and next_page == current_page:
+                        # Next section is on same page
+                        next_y0, _ = section_ys[i + 1]
+                        end_y = next_y0 if next_y0 else page_height
                     else:
-                        # This is the last section, extract from remaining pages
-                        for page_num in range(current_page + 1, len(doc)):
-                            page = doc[page_num]
-                            page_content = self.extract_text_in_range(page, 0, page.rect.height)
+                        # Next section is on different page or this is the last section
+                        end_y = page_height
+                    
+                    # Extract text from current page
+                    page_content = self.extract_text_in_range(blocks, block_ys, heading_y1, end_y)
+                    if page_content.strip():
+                        section_content.append(page_content)
+                
+                # Extract content from subsequent pages until next section
+                if next_section:
+                    for page_num in range(current_page + 1, next_page):
+                        if page_num < page_count:
+                            blocks, block_ys, page_height = self._get_page_layout(doc, page_num, page_cache)
+                            page_content = self.extract_text_in_range(blocks, block_ys, 0, page_height)
                             if page_content.strip():
                                 section_content.append(page_content)
                     
-                    # Combine all content for this section
-                    full_content = " ".join(section_content).strip()
-                    
-                    if full_content:  # Only add sections with content
-                        extracted_sections.append({
-                            'doc_name': os.path.basename(pdf_path),
-                            'heading_text': section['text'],
-                            'page_num': section['page'],
-                            'content_text': full_content,
-                            'level': section['level']
-                        })
-        
+                    # Extract content from the page with next section (up to next section); a
+                    # next section on the current page was already bounded above
+                    if current_page < next_page < page_count:
+                        next_y0, _ = section_ys[i + 1]
+                        if next_y0:
+                            blocks, block_ys, _ = self._get_page_layout(doc, next_page, page_cache)
+                            page_content = self.extract_text_in_range(blocks, block_ys, 0, next_y0)
+                            if page_content.strip():
+                                section_content.append(page_content)
+                else:
+                    # This is the last section, extract from remaining pages
+                    for page_num in range(current_page + 1, page_count):
+                        blocks, block_ys, page_height = self._get_page_layout(doc, page_num, page_cache)
+                        page_content = self.extract_text_in_range(blocks, block_ys, 0, page_height)
+                        if page_content.strip():
+                            section_content.append(page_content)
+                
+                # Combine all content for this section
+                full_content = " ".join(section_content).strip()
+                
+                if full_content:  # Only add sections with content
+                    extracted_sections.append({
+                        'doc_name': doc_name,
+                        'heading_text': heading_text,
+                        'page_num': current_page,
+                        'content_text': full_content,
+                        'level': section['level']
+                    })
+    
         except Exception as e:
-            print(f"Error processing {pdf_path}: {e}")
+            print(f"Error processing {doc.name}: {e}")
         
         return extracted_sections
     
-    def process_document(self, pdf_path: str, outline_path: str) -> List[Dict[str, Any]]:
-        """Process a single document and its outline to extract section content."""
+    def process_document(self, pdf_path: str, outline_path: str,
+                         outline_data: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """
+        Process a single document and its outline to extract section content.
+        
+        An already-loaded outline_data is used instead of reading outline_path.
+        """
         try:
             # Load the outline from Round 1A
-            with open(outline_path, 'r', encoding='utf-8') as f:
-                outline_data = json.load(f)
+            if outline_data is None:
+                outline_data = load_outline(outline_path)
             
             outline = outline_data.get('outline', [])
             
@@ -161,116 +321,143 @@ class ContentSegmenter:
                 # For testing with text files
                 return self.extract_section_content_from_text(pdf_path, outline)
             else:
-                # For actual PDF files
-                if not outline:
-                    # If no outline, extract content directly from PDF
-                    return self.extract_content_directly_from_pdf(pdf_path)
-                else:
-                    # Use the outline to extract content
-                    return self.extract_section_content(pdf_path, outline)
+                # For actual PDF files, open once and hand the document to whichever path runs
+                with fitz.open(pdf_path) as doc:
+                    return self._extract_from_doc(doc, outline)
             
         except Exception as e:
             print(f"Error processing document {pdf_path}: {e}")
             return []
     
-    def extract_content_directly_from_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
-        """Extract content directly from PDF when no outline is available."""
+    def _extract_from_doc(self, doc: fitz.Document, outline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Extract sections from an open document, directly when there is no outline."""
+        if not outline:
+            # If no outline, extract content directly from PDF
+            return self.extract_content_directly_from_pdf(doc)
+        else:
+            # Use the outline to extract content
+            return self.extract_section_content(doc, outline)
+    
+    def process_documents(self, pairs: List[Tuple[str, str]], workers: int = None,
+                          use_threads: bool = False, executor: ProcessPoolExecutor = None) -> List[List[Dict[str, Any]]]:
+        """
+        Process independent (pdf_path, outline_path) pairs in parallel, returning results in input order.
+        
+        A caller's process pool (shared with other work) is used instead of spawning a new one.
+        """
+        if not pairs:
+            return []
+        
+        workers = min(workers or os.cpu_count() or 1, len(pairs))
+        if workers == 1:
+            return [self.process_document(pdf_path, outline_path) for pdf_path, outline_path in pairs]
+        
+        if executor is not None:
+            return list(executor.map(_process_document_worker, pairs))
+        
+        if use_threads:
+            # All per-document state is local to process_document, so threads can share this instance
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda pair: self.process_document(*pair), pairs))
+        
+        # Spawned (not forked) workers: callers may have other threads running, e.g. the
+        # model encoding the query, whose held locks a forked child would inherit
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return list(executor.map(_process_document_worker, pairs))
+    
+    def extract_content_directly_from_pdf(self, doc: fitz.Document) -> List[Dict[str, Any]]:
+        """Extract content directly from an open PDF when no outline is available."""
         try:
-            import fitz  # PyMuPDF
+            doc_name = os.path.basename(doc.name)
+            sections = []
+            # Text of every non-empty page, reused by the paragraph fallback below
+            page_texts = []
             
-            with fitz.open(pdf_path) as doc:
-                sections = []
+            # Process each page separately to get page numbers
+            for page_num in range(len(doc)):
+                page = doc[page_num]
+                if not self._page_has_text(page):
+                    continue
+                page_text = page.get_text(flags=_TEXT_FLAGS)
                 
-                # Process each page separately to get page numbers
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    page_text = page.get_text()
-                    
-                    if not page_text.strip():
+                if not page_text.strip():
+                    continue
+                page_texts.append((page_num, page_text))
+                
+                # Split page text into lines
+                lines = page_text.split('\n')
+                current_section = None
+                current_content = []
+                current_length = 0
+                
+                for line in lines:
+                    line = line.strip()
+                    if not line:
                         continue
                     
-                    # Split page text into lines
-                    lines = page_text.split('\n')
-                    current_section = None
-                    current_content = []
-                    
-                    for line in lines:
-                        line = line.strip()
-                        if not line:
-                            continue
-                        
-                        # Check if this line looks like a heading
-                        is_heading = (
-                            len(line) < 100 and 
-                            (line.isupper() or 
-                             line.endswith(':') or 
-                             line.endswith('.') or
-                             any(keyword in line.lower() for keyword in [
-                                 'guide', 'activities', 'tips', 'cuisine', 'history', 'culture', 
-                                 'restaurants', 'hotels', 'cities', 'coastal', 'adventures',
-                                 'packing', 'nightlife', 'entertainment', 'overview', 'introduction'
-                             ]))
-                        )
-                        
-                        if is_heading and len(line) > 10:
-                            # Save previous section if exists
-                            if current_section and current_content:
-                                sections.append({
-                                    'doc_name': os.path.basename(pdf_path),
-                                    'heading_text': current_section,
-                                    'page_num': page_num + 1,  # 1-indexed page numbers
-                                    'content_text': '\n'.join(current_content),
-                                    'level': 'H1'
-                                })
-                            
-                            # Start new section
-                            current_section = line
-                            current_content = []
-                        else:
-                            # Add to current content
-                            if current_section:
-                                current_content.append(line)
-                            elif len(line) > 50:  # Substantial content without heading
-                                current_content.append(line)
+                    # Check if this line looks like a heading; the length bounds are tested first so
+                    # short lines never reach the case and keyword checks (which run case-insensitively in C)
+                    is_heading = (
+                        10 < len(line) < 100 and 
+                        (line.isupper() or 
+                         line.endswith((':', '.')) or
+                         self._heading_keyword_re.search(line) is not None)
+                    )
                     
-                    # Add the last section from this page
-                    if current_section and current_content:
-                        sections.append({
-                            'doc_name': os.path.basename(pdf_path),
-                            'heading_text': current_section,
-                            'page_num': page_num + 1,  # 1-indexed page numbers
-                            'content_text': '\n'.join(current_content),
-                            'level': 'H1'
-                        })
-                
-                # If no sections found, fall back to paragraph-based approach with page numbers
-                if not sections:
-                    for page_num in range(len(doc)):
-                        page = doc[page_num]
-                        page_text = page.get_text()
-                        
-                        if not page_text.strip():
-                            continue
+                    if is_heading:
+                        # Save previous section if exists
+                        if current_section and current_content:
+                            sections.append({
+                                'doc_name': doc_name,
+                                'heading_text': current_section,
+                                'page_num': page_num + 1,  # 1-indexed page numbers
+                                'content_text': '\n'.join(current_content),
+                                'level': 'H1'
+                            })
                         
-                        paragraphs = [p.strip() for p in page_text.split('\n\n') if p.strip()]
-                        for i, paragraph in enumerate(paragraphs[:5]):  # Limit per page
-                            if len(paragraph) > 100:
-                                # Try to extract a title from the first sentence
-                                first_sentence = paragraph.split('.')[0]
-                                title = first_sentence if len(first_sentence) < 100 else f"Section {i+1}"
-                                
-                                sections.append({
-                                    'doc_name': os.path.basename(pdf_path),
-                                    'heading_text': title,
-                                    'page_num': page_num + 1,  # 1-indexed page numbers
-                                    'content_text': paragraph,
-                                    'level': 'H1'
-                                })
-                
-                return sections
+                        # Start new section
+                        current_section = line
+                        current_content = []
+                        current_length = 0
+                    elif current_length < self.max_section_chars:
+                        # Add to current content (until the section is long enough to be capped)
+                        if current_section or len(line) > 50:  # Substantial content without heading
+                            current_content.append(line)
+                            current_length += len(line) + 1
                 
+                # Add the last section from this page
+                if current_section and current_content:
+                    sections.append({
+                        'doc_name': doc_name,
+                        'heading_text': current_section,
+                        'page_num': page_num + 1,  # 1-indexed page numbers
+                        'content_text': '\n'.join(current_content),
+                        'level': 'H1'
+                    })
+            
+            # If no sections found, fall back to paragraph-based approach with page numbers
+            if not sections:
+                for page_num, page_text in page_texts:
+                    # Only the first few non-empty paragraphs are kept, so stop scanning once we have them
+                    paragraphs = (p for p in (m.group().strip() for m in _PARAGRAPH_RE.finditer(page_text)) if p)
+                    for i, paragraph in enumerate(islice(paragraphs, 5)):  # Limit per page
+                        if len(paragraph) > 100:
+                            # Try to extract a title from the first sentence
+                            first_sentence = paragraph.split('.')[0]
+                            title = first_sentence if len(first_sentence) < 100 else f"Section {i+1}"
+                            
+                            sections.append({
+                                'doc_name': doc_name,
+                                'heading_text': title,
+                                'page_num': page_num + 1,  # 1-indexed page numbers
+                                'content_text': paragraph,
+                                'level': 'H1'
+                            })
+            
+            return sections
+            
         except Exception as e:
-            print(f"Error extracting content directly from PDF {pdf_path}: {e}")
+            print(f"Error extracting content directly from PDF {doc.name}: {e}")
             return []
     
     def extract_section_content_from_text(self, text_path: str, outline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -279,34 +466,47 @@ class ContentSegmenter:
             with open(text_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
+            doc_name = os.path.basename(text_path)
             extracted_sections = []
             
+            # Only valid headings and the headings that bound them are ever looked up
+            needed_headings = []
+            for i, section in enumerate(outline):
+                if self.is_valid_heading(section['text']):
+                    needed_headings.append(section['text'])
+                    if i + 1 < len(outline):
+                        needed_headings.append(outline[i + 1]['text'])
+            
+            # Locate all needed headings in a single pass over the content
+            heading_offsets = self._find_heading_offsets(content, needed_headings)
+            
             for i, section in enumerate(outline):
-                if not self.is_valid_heading(section['text']):
+                heading_text = section['text']
+                if not self.is_valid_heading(heading_text):
                     continue
                 
                 # Find the section content by looking for the heading and next heading
-                heading_text = section['text']
-                start_idx = content.find(heading_text)
+                positions = heading_offsets.get(heading_text)
                 
-                if start_idx == -1:
+                if not positions:
                     continue
+                start_idx = positions[0]
                 
                 # Find the end of this section (next heading or end of file)
                 end_idx = len(content)
                 if i + 1 < len(outline):
-                    next_heading = outline[i + 1]['text']
-                    next_idx = content.find(next_heading, start_idx + len(heading_text))
-                    if next_idx != -1:
-                        end_idx = next_idx
+                    next_positions = heading_offsets.get(outline[i + 1]['text'], [])
+                    k = bisect_left(next_positions, start_idx + len(heading_text))
+                    if k < len(next_positions):
+                        end_idx = next_positions[k]
                 
                 # Extract the content between headings
                 section_content = content[start_idx + len(heading_text):end_idx].strip()
                 
                 if section_content:
                     extracted_sections.append({
-                        'doc_name': os.path.basename(text_path),
-                        'heading_text': section['text'],
+                        'doc_name': doc_name,
+                        'heading_text': heading_text,
                         'page_num': section['page'],
                         'content_text': section_content,
                         'level': section['level']
@@ -318,6 +518,10 @@ class ContentSegmenter:
             print(f"Error extracting content from text file {text_path}: {e}")
             return []
 
+def _process_document_worker(pair: Tuple[str, str]) -> List[Dict[str, Any]]:
+    """Process one (pdf_path, outline_path) pair in a pool worker with its own segmenter."""
+    return ContentSegmenter().process_document(*pair)
+
 def main():
     """Test the content segmenter with a sample document."""
     segmenter = ContentSegmenter()
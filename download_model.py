@@ -2,11 +2,44 @@
 """
 Model Download Script for Adobe Hackathon Round 1B
 Downloads the all-MiniLM-L6-v2 model and saves it locally for offline use.
+
+Optionally, when optimum and onnxruntime are installed, an int8 ONNX copy of the model
+is also written to local_model/onnx/model_int8.onnx. The pipeline loads it through
+onnx_encoder.OnnxSentenceEncoder when present and uses the PyTorch model otherwise.
+optimum is only needed for this export step, so it is not in requirements.txt.
 """
 
 import os
 from sentence_transformers import SentenceTransformer
 
+def quantize_model(save_path: str):
+    """Export the saved model to ONNX and write a dynamically quantized int8 copy (optional step)."""
+    onnx_dir = os.path.join(save_path, 'onnx')
+    int8_path = os.path.join(onnx_dir, 'model_int8.onnx')
+    
+    if os.path.isfile(int8_path):
+        print(f"📁 Quantized model already present: {int8_path}")
+        return
+    
+    try:
+        from optimum.exporters.onnx import main_export
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError:
+        print("⚠️  optimum/onnxruntime not installed, skipping the optional int8 ONNX export; "
+              "the pipeline will use the PyTorch model. To enable it: pip install optimum[onnxruntime]")
+        return
+    
+    print("⚙️  Exporting model to ONNX...")
+    main_export(model_name_or_path=save_path, output=onnx_dir, task="feature-extraction")
+    
+    print("⚙️  Quantizing ONNX model to int8...")
+    fp32_path = os.path.join(onnx_dir, 'model.onnx')
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    
+    # Only the int8 graph is shipped; drop the intermediate FP32 export
+    os.remove(fp32_path)
+    print(f"✅ Quantized model saved to '{int8_path}'")
+
 def download_model():
     """Download and save the sentence transformer model locally."""
     
@@ -14,6 +47,19 @@ def download_model():
     model_name = 'all-MiniLM-L6-v2'
     save_path = './local_model'
     
+    # Skip the hub round-trip entirely when a saved model is already present
+    if os.path.isfile(os.path.join(save_path, 'config.json')):
+        print(f"📁 Model already present in: {os.path.abspath(save_path)}")
+        try:
+            print("🔍 Verifying local model loading...")
+            SentenceTransformer(save_path, local_files_only=True)
+            print("✅ Local model loading verified successfully!")
+        except Exception as e:
+            print(f"⚠️  Existing model could not be loaded ({e}), downloading again...")
+        else:
+            quantize_model(save_path)
+            return
+    
     print(f"Downloading model: {model_name}")
     print(f"Save path: {save_path}")
     
@@ -35,6 +81,8 @@ def download_model():
         local_model = SentenceTransformer(save_path, local_files_only=True)
         print("✅ Local model loading verified successfully!")
         
+        quantize_model(save_path)
+        
     except Exception as e:
         print(f"❌ Error downloading model: {e}")
         raise
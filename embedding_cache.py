@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Persistent Embedding Cache for Adobe Hackathon Round 1B
+Stores one embedding per distinct text in SQLite so repeated sections, chunks and
+queries are only ever encoded once per model.
+"""
+
+import os
+import logging
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'embed_cache.db')
+
+# Keys per SELECT ... IN (...), below SQLite's default host-parameter limit
+_LOOKUP_CHUNK = 500
+
+# Vectors kept in process memory in front of SQLite (~1.5 KB each at 384 dims)
+_MEMORY_ENTRIES = 8192
+
+class EmbeddingCache:
+    """SQLite-backed map from sha256(model, text) to a float32 embedding, with an in-memory LRU in front."""
+
+    def __init__(self, namespace: str, path: str = None):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            namespace: Model identity mixed into every key, so models never share entries
+            path: Database file (default: R1B_EMBED_CACHE or ./.cache/embed_cache.db)
+        """
+        self.namespace = namespace.encode('utf-8') + b'\x1e'
+        self.path = path or os.getenv('R1B_EMBED_CACHE', DEFAULT_CACHE_PATH)
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)')
+            self._conn.commit()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("⚠️  Embedding cache disabled (%s): %s", self.path, e)
+            self._conn = None
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(self.namespace + text.encode('utf-8')).digest()
+
+    def cached_encode(self, encode: Callable, texts: List[str], **encode_kwargs) -> np.ndarray:
+        """
+        Embed texts, encoding only the ones not cached yet in a single batch.
+
+        Args:
+            encode: Model encode function returning one row per text
+            texts: Texts to embed
+            **encode_kwargs: Passed through to encode for the cache misses
+
+        Returns:
+            float32 matrix with one embedding per text, in input order
+        """
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(set(keys))
+
+        # Identical texts (repeated boilerplate, headers) share a key, so each distinct
+        # miss is encoded once and scattered back to every occurrence
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            encoded = np.asarray(encode(list(missing.values()), **encode_kwargs), dtype=np.float32)
+            new_entries = dict(zip(missing, encoded))
+            self._store(new_entries)
+            found.update(new_entries)
+
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def _remember(self, entries: dict) -> None:
+        """Add entries to the in-memory LRU, evicting the least recently used. Caller holds the lock."""
+        for key, vector in entries.items():
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+        while len(self._memory) > _MEMORY_ENTRIES:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: set) -> dict:
+        """Fetch the cached vectors for keys, from memory first and then SQLite."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    found[key] = vector
+                    self._memory.move_to_end(key)
+            if self._conn is None:
+                return found
+
+            keys = [key for key in keys if key not in found]
+            from_disk = {}
+            for start in range(0, len(keys), _LOOKUP_CHUNK):
+                batch = keys[start:start + _LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(batch))
+                rows = self._conn.execute(
+                    f'SELECT key, vector FROM embeddings WHERE key IN ({placeholders})', batch)
+                for key, vector in rows:
+                    from_disk[key] = np.frombuffer(vector, dtype=np.float32)
+            self._remember(from_disk)
+        found.update(from_disk)
+        return found
+
+    def _store(self, entries: dict) -> None:
+        """Persist freshly encoded vectors; a failed write only costs a re-encode later."""
+        with self._lock:
+            self._remember(entries)
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.executemany('INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)',
+                                       ((key, vector.tobytes()) for key, vector in entries.items()))
+                self._conn.commit()
+        except sqlite3.Error as e:
+            logger.warning("⚠️  Could not update embedding cache: %s", e)
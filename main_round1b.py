@@ -4,36 +4,211 @@ Main Orchestration Module for Adobe Hackathon Round 1B
 Implements the complete four-stage pipeline for persona-driven document intelligence.
 """
 
+from __future__ import annotations
+
 import os
+import sys
 import json
+import queue
 import time
-import argparse
-import numpy as np
-from typing import List, Dict, Any
+import hashlib
+import logging
+import logging.handlers
+import threading
+import multiprocessing
+from typing import TYPE_CHECKING, List, Dict, Any
 from datetime import datetime
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
+
+try:
+    import orjson
+except ImportError:
+    # Optional: fall back to the standard library serializer
+    orjson = None
+
+if TYPE_CHECKING:
+    # Only named in annotations; imported lazily at runtime
+    import argparse
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fallback input files holding the persona / job-to-be-done, in priority order
+_PERSONA_FILES = ("persona.txt", "persona", "user_persona.txt")
+_JBTD_FILES = ("job_to_be_done.txt", "job_to_be_done", "task.txt", "objective.txt")
+
+# Sections reported in the output; ranking stops once these are ordered
+_MAX_OUTPUT_SECTIONS = 50
+
+def _norm(text: str) -> str:
+    """Strip surrounding whitespace, treating None as empty."""
+    return text.strip() if text else ""
+
+def configure_logging(capacity: int = 256) -> None:
+    """
+    Send progress messages to stdout in batches instead of one write per message.
+    
+    Safe to call more than once; later calls leave the existing handler in place.
+    """
+    if any(isinstance(handler, logging.handlers.MemoryHandler) for handler in logger.handlers):
+        return
+    target = logging.StreamHandler(sys.stdout)
+    target.setFormatter(logging.Formatter('%(message)s'))
+    # Buffered records are flushed when the buffer fills, on warnings and errors, and at
+    # interpreter exit
+    handler = logging.handlers.MemoryHandler(capacity, flushLevel=logging.WARNING, target=target)
+    # The embedding, cache and ranking modules log through the same buffer
+    for name in (__name__, "semantic_embedder", "embedding_cache", "ranking_engine"):
+        pipeline_logger = logging.getLogger(name)
+        pipeline_logger.addHandler(handler)
+        pipeline_logger.setLevel(logging.INFO)
+        pipeline_logger.propagate = False
+
+@lru_cache(maxsize=1)
+def _get_process_pdf():
+    """Import the Round 1A outline generator on first use only."""
+    from main import process_pdf
+    return process_pdf
+
+def _generate_and_extract_worker(pdf_path: str):
+    """Generate one PDF's Round 1A outline and extract its sections, in a pool worker."""
+    # Round 1A's module sets up its log file with filemode='w' on import; configuring the
+    # root logger first makes that a no-op, so pool workers append instead of clobbering
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s',
+                        filename='final_processing_log.log', filemode='a')
+    from content_segmenter import ContentSegmenter
+    
+    outline_data = _get_process_pdf()(pdf_path)
+    # PyMuPDF opens the file itself, so its bytes are never copied into Python
+    return outline_data, ContentSegmenter().process_document(pdf_path, None, outline_data)
 
-from content_segmenter import ContentSegmenter
-from semantic_embedder import SemanticEmbedder
-from ranking_engine import RankingEngine
+_JSON_OPTIONS = (orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# Output buffer size; sections are serialized one at a time into it
+_WRITE_BUFFER_SIZE = 64 * 1024
+
+def _dumps_indented(value: Any, depth: int) -> bytes:
+    """orjson-serialize value as if it were nested depth levels deep in an indented document."""
+    # Strings never contain raw newlines in JSON, so every newline is a layout newline
+    return orjson.dumps(value, option=_JSON_OPTIONS).replace(b"\n", b"\n" + b"  " * depth)
+
+def write_json(path: str, data: Any) -> None:
+    """
+    Write data to path as indented UTF-8 JSON, using orjson when it is installed.
+    
+    With orjson, a top-level dict is streamed one list element at a time, so the full
+    document never exists as one bytes object; the bytes are identical to a single dumps.
+    """
+    if orjson is None:
+        # json.dump already writes the document in small chunks
+        with open(path, 'w', encoding='utf-8', buffering=_WRITE_BUFFER_SIZE) as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        return
+    
+    with open(path, 'wb', buffering=_WRITE_BUFFER_SIZE) as f:
+        if not isinstance(data, dict) or not data or not all(isinstance(key, str) for key in data):
+            f.write(orjson.dumps(data, option=_JSON_OPTIONS))
+            return
+        
+        f.write(b"{")
+        for i, (key, value) in enumerate(data.items()):
+            f.write((b",\n  " if i else b"\n  ") + orjson.dumps(key, option=_JSON_OPTIONS) + b": ")
+            if isinstance(value, list) and value:
+                f.write(b"[")
+                f.writelines((b",\n    " if j else b"\n    ") + _dumps_indented(item, 2)
+                             for j, item in enumerate(value))
+                f.write(b"\n  ]")
+            else:
+                f.write(_dumps_indented(value, 1))
+        f.write(b"\n}")
 
 class PersonaDrivenDocumentIntelligence:
     """Main orchestrator for the persona-driven document intelligence system."""
     
-    def __init__(self, model_path: str = "./local_model"):
+    def __init__(self, model_path: str = "./local_model", max_workers: int = None,
+                 cache_dir: str = None, quantize_embeddings: bool = False):
         """
         Initialize the system with all components.
         
         Args:
             model_path: Path to the locally saved sentence transformer model
+            max_workers: Number of PDFs processed concurrently (default: R1B_WORKERS or CPU count)
+            cache_dir: Directory for cached embeddings (default: R1B_CACHE_DIR or ./.cache)
+            quantize_embeddings: Rank against int8-quantized content embeddings (scores differ
+                slightly from float32 ranking, so off by default)
         """
-        print("🚀 Initializing Persona-Driven Document Intelligence System...")
+        logger.info("🚀 Initializing Persona-Driven Document Intelligence System...")
+        
+        self.max_workers = max_workers or int(os.getenv("R1B_WORKERS", os.cpu_count() or 4))
+        self.cache_dir = cache_dir or os.getenv("R1B_CACHE_DIR", ".cache")
+        self.quantize_embeddings = quantize_embeddings
+        # Persona/JBTD resolved by the latest run, reused by main()'s error fallback
+        self._last_persona = None
+        self._last_jbtd = None
+        # input_dir -> (pdf_files, entry names) while a pipeline run is active, else None
+        self._pdf_files_cache = None
+        # Generated outlines are written by one background thread so parsing never waits on disk;
+        # close() drains the queue and stops it
+        self._write_queue = queue.Queue()
+        self._write_thread = threading.Thread(target=self._write_worker, name="outline-writer", daemon=True)
+        self._write_thread.start()
+        
+        # Heavy modules (numpy, PyMuPDF, sentence-transformers/torch) are imported here
+        # rather than at module level so --help and early exits stay fast
+        import numpy as np
+        import fast_ops
+        from content_segmenter import ContentSegmenter
+        from semantic_embedder import SemanticEmbedder, quantize_int8
+        from ranking_engine import RankingEngine
+        self._np = np
+        self._quantize_int8 = quantize_int8
         
         # Initialize components
         self.content_segmenter = ContentSegmenter()
         self.semantic_embedder = SemanticEmbedder(model_path)
         self.ranking_engine = RankingEngine(self.semantic_embedder)
         
-        print("✅ System initialized successfully!")
+        # Pre-warm the similarity kernel (compiled code does not depend on the embedding size,
+        # so the model itself stays unloaded until Stage 2's query embedding needs it)
+        fast_ops.warm_up()
+        
+        logger.info("✅ System initialized successfully!")
+    
+    def __enter__(self) -> "PersonaDrivenDocumentIntelligence":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Write any queued outlines and stop the background writer thread."""
+        if self._write_thread.is_alive():
+            # None is the stop sentinel; it is queued behind every pending write
+            self._write_queue.put(None)
+            self._write_thread.join()
+    
+    def _queue_write(self, path: str, data: Any) -> None:
+        """Hand a JSON file to the writer thread, or write it directly once close() has run."""
+        if self._write_thread.is_alive():
+            self._write_queue.put((path, data))
+        else:
+            write_json(path, data)
+    
+    def _write_worker(self) -> None:
+        """Write queued (path, data) JSON files until the None sentinel from close() arrives."""
+        while True:
+            item = self._write_queue.get()
+            try:
+                if item is None:
+                    return
+                path, data = item
+                write_json(path, data)
+            except Exception as e:
+                logger.error("❌ Failed to write %s: %s", path, e)
+            finally:
+                self._write_queue.task_done()
     
     def get_persona_and_jbtd(self, persona: str = None, jbtd: str = None, input_dir: str = None) -> Dict[str, str]:
         """
@@ -51,56 +226,57 @@ class PersonaDrivenDocumentIntelligence:
         Returns:
             Dictionary with persona and jbtd text
         """
-        print("📁 Getting persona and job-to-be-done...")
+        logger.info("📁 Getting persona and job-to-be-done...")
         
-        persona_text = ""
-        jbtd_text = ""
+        persona_text = _norm(persona)
+        jbtd_text = _norm(jbtd)
+        environ = os.environ
+        env_persona = environ.get('PERSONA')
+        env_jbtd = environ.get('JBTD') or environ.get('JOB_TO_BE_DONE')
         
         try:
             # Priority 1: Use provided parameters (command line args)
-            if persona and persona.strip():
-                persona_text = persona.strip()
-                print(f"✅ Using persona from command line: {persona_text[:100]}...")
-            elif os.getenv('PERSONA'):
+            if persona_text:
+                logger.info("✅ Using persona from command line: %.100s...", persona_text)
+            elif env_persona:
                 # Priority 2: Environment variables
-                persona_text = os.getenv('PERSONA').strip()
-                print(f"✅ Using persona from environment: {persona_text[:100]}...")
+                persona_text = _norm(env_persona)
+                logger.info("✅ Using persona from environment: %.100s...", persona_text)
             elif input_dir:
                 # Priority 3: Try to read from files (backward compatibility)
-                persona_files = ["persona.txt", "persona", "user_persona.txt"]
-                for persona_file in persona_files:
-                    persona_path = os.path.join(input_dir, persona_file)
-                    if os.path.exists(persona_path):
+                input_names = self._input_file_names(input_dir)
+                for persona_file in _PERSONA_FILES:
+                    if persona_file in input_names:
+                        persona_path = os.path.join(input_dir, persona_file)
                         with open(persona_path, 'r', encoding='utf-8') as f:
                             persona_text = f.read().strip()
-                        print(f"✅ Read persona from {persona_file}: {persona_text[:100]}...")
+                        logger.info("✅ Read persona from %s: %.100s...", persona_file, persona_text)
                         break
             
             if not persona_text:
                 # Priority 4: Default value
                 persona_text = "document analyst"
-                print("⚠️  Using default persona: document analyst")
+                logger.warning("⚠️  Using default persona: document analyst")
             
             # Same priority order for job-to-be-done
-            if jbtd and jbtd.strip():
-                jbtd_text = jbtd.strip()
-                print(f"✅ Using JBTD from command line: {jbtd_text[:100]}...")
-            elif os.getenv('JBTD') or os.getenv('JOB_TO_BE_DONE'):
-                jbtd_text = (os.getenv('JBTD') or os.getenv('JOB_TO_BE_DONE')).strip()
-                print(f"✅ Using JBTD from environment: {jbtd_text[:100]}...")
+            if jbtd_text:
+                logger.info("✅ Using JBTD from command line: %.100s...", jbtd_text)
+            elif env_jbtd:
+                jbtd_text = _norm(env_jbtd)
+                logger.info("✅ Using JBTD from environment: %.100s...", jbtd_text)
             elif input_dir:
-                jbtd_files = ["job_to_be_done.txt", "job_to_be_done", "task.txt", "objective.txt"]
-                for jbtd_file in jbtd_files:
-                    jbtd_path = os.path.join(input_dir, jbtd_file)
-                    if os.path.exists(jbtd_path):
+                input_names = self._input_file_names(input_dir)
+                for jbtd_file in _JBTD_FILES:
+                    if jbtd_file in input_names:
+                        jbtd_path = os.path.join(input_dir, jbtd_file)
                         with open(jbtd_path, 'r', encoding='utf-8') as f:
                             jbtd_text = f.read().strip()
-                        print(f"✅ Read JBTD from {jbtd_file}: {jbtd_text[:100]}...")
+                        logger.info("✅ Read JBTD from %s: %.100s...", jbtd_file, jbtd_text)
                         break
             
             if not jbtd_text:
                 jbtd_text = "extract relevant information from documents"
-                print("⚠️  Using default JBTD: extract relevant information from documents")
+                logger.warning("⚠️  Using default JBTD: extract relevant information from documents")
             
             return {
                 'persona': persona_text,
@@ -108,83 +284,182 @@ class PersonaDrivenDocumentIntelligence:
             }
             
         except Exception as e:
-            print(f"❌ Error getting persona and JBTD: {e}")
+            logger.error("❌ Error getting persona and JBTD: %s", e)
             # Return defaults on error
             return {
                 'persona': "document analyst",
                 'jbtd': "extract relevant information from documents"
             }
     
-    def process_documents(self, input_dir: str, output_dir: str) -> List[Dict[str, Any]]:
+    def _input_file_names(self, input_dir: str) -> set:
+        """Names of the entries in input_dir, or an empty set when it cannot be listed."""
+        try:
+            return self._list_input_dir(input_dir)[1]
+        except OSError:
+            return set()
+    
+    def _list_input_dir(self, input_dir: str) -> tuple:
+        """
+        List input_dir, once per pipeline run; outside a run the directory is always scanned.
+        
+        Args:
+            input_dir: Directory containing PDF files
+            
+        Returns:
+            Tuple of (pdf_files, input_names) where input_names holds every entry name
+        """
+        cache = self._pdf_files_cache
+        cached = cache.get(input_dir) if cache is not None else None
+        if cached is None:
+            input_entries = [entry.name for entry in os.scandir(input_dir)]
+            pdf_files = [f for f in input_entries if f.lower().endswith('.pdf')]
+            cached = (pdf_files, set(input_entries))
+            if cache is not None:
+                cache[input_dir] = cached
+        return cached
+    
+    def _resolve_outline(self, pdf_file: str, input_dir: str, output_dir: str,
+                         input_names: set, output_names: set) -> str:
+        """
+        Find the Round 1A outline for one PDF.
+        
+        Args:
+            pdf_file: PDF filename inside input_dir
+            input_dir: Directory containing PDF files
+            output_dir: Directory containing Round 1A outlines
+            input_names: Names of the entries in input_dir
+            output_names: Names of the entries in output_dir
+            
+        Returns:
+            Path of the outline JSON, or None when there is none
+        """
+        stem_outline = os.path.splitext(pdf_file)[0] + ".json"
+        full_outline = pdf_file + ".json"
+        
+        # Try different possible outline file names, in priority order; only a hit is joined
+        if stem_outline in output_names:
+            return os.path.join(output_dir, stem_outline)
+        elif full_outline in output_names:
+            return os.path.join(output_dir, full_outline)
+        elif stem_outline in input_names:
+            return os.path.join(input_dir, stem_outline)
+        elif full_outline in input_names:
+            return os.path.join(input_dir, full_outline)
+        return None
+    
+    def _generate_and_extract(self, pdf_file: str, input_dir: str, output_dir: str) -> List[Dict[str, Any]]:
+        """Generate a missing outline with the Round 1A approach, then extract the PDF's sections."""
+        pdf_path = os.path.join(input_dir, pdf_file)
+        logger.warning("⚠️  No outline found for %s, attempting to generate outline...", pdf_file)
+        try:
+            outline_data = _get_process_pdf()(pdf_path)
+            outline_path = os.path.join(output_dir, os.path.splitext(pdf_file)[0] + ".json")
+            # Persist the outline in the background; extraction uses the in-memory copy
+            self._queue_write(outline_path, outline_data)
+            
+            # Now extract content
+            sections = self.content_segmenter.process_document(pdf_path, outline_path, outline_data)
+            logger.info("✅ Generated outline and extracted %s sections from %s", len(sections), pdf_file)
+            return sections
+        except Exception as e:
+            logger.error("❌ Failed to generate outline for %s: %s", pdf_file, e)
+            return []
+    
+    def _collect_generated(self, pdf_file: str, future, output_dir: str) -> List[Dict[str, Any]]:
+        """Queue the outline a pool worker generated for pdf_file and return its sections."""
+        try:
+            outline_data, sections = future.result()
+        except Exception as e:
+            logger.error("❌ Failed to generate outline for %s: %s", pdf_file, e)
+            return []
+        outline_path = os.path.join(output_dir, os.path.splitext(pdf_file)[0] + ".json")
+        self._queue_write(outline_path, outline_data)
+        logger.info("✅ Generated outline and extracted %s sections from %s", len(sections), pdf_file)
+        return sections
+    
+    def process_documents(self, input_dir: str, output_dir: str, pdf_files: List[str] = None) -> List[Dict[str, Any]]:
         """
         Stage 1: Process all PDF documents and extract section content.
         
         Args:
             input_dir: Directory containing PDF files
             output_dir: Directory containing Round 1A outlines
+            pdf_files: PDF filenames to process (default: every PDF in input_dir)
             
         Returns:
             List of all extracted sections from all documents
         """
-        print("📚 Stage 1: Processing documents and extracting content...")
+        logger.info("📚 Stage 1: Processing documents and extracting content...")
         
         all_sections = []
         
         try:
-            # Get all PDF files
-            pdf_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.pdf')]
-            print(f"📄 Found {len(pdf_files)} PDF files")
+            # Scan each directory once; outline candidates are then resolved by set lookups
+            listed_pdf_files, input_names = self._list_input_dir(input_dir)
+            try:
+                output_names = {entry.name for entry in os.scandir(output_dir)}
+            except (FileNotFoundError, NotADirectoryError):
+                output_names = set()
             
+            # Get all PDF files
+            if pdf_files is None:
+                pdf_files = listed_pdf_files
+            logger.info("📄 Found %s PDF files", len(pdf_files))
+            
+            # Resolve every outline up front (set lookups only) so pool workers only parse
+            outline_paths = [self._resolve_outline(pdf_file, input_dir, output_dir, input_names, output_names)
+                             for pdf_file in pdf_files]
+            pairs = [(os.path.join(input_dir, pdf_file), outline_path)
+                     for pdf_file, outline_path in zip(pdf_files, outline_paths) if outline_path]
+            missing = [pdf_file for pdf_file, outline_path in zip(pdf_files, outline_paths) if not outline_path]
             for pdf_file in pdf_files:
-                pdf_path = os.path.join(input_dir, pdf_file)
-                
-                # Try different possible outline file names
-                outline_candidates = [
-                    os.path.join(output_dir, os.path.splitext(pdf_file)[0] + ".json"),
-                    os.path.join(output_dir, pdf_file + ".json"),
-                    os.path.join(input_dir, os.path.splitext(pdf_file)[0] + ".json"),
-                    os.path.join(input_dir, pdf_file + ".json")
-                ]
-                
-                outline_path = None
-                for candidate in outline_candidates:
-                    if os.path.exists(candidate):
-                        outline_path = candidate
-                        break
-                
-                print(f"🔍 Processing {pdf_file}...")
-                
+                logger.info("🔍 Processing %s...", pdf_file)
+            
+            workers = max(1, min(self.max_workers, len(pdf_files)))
+            if workers > 1 and missing:
+                # Outline generation is CPU-bound Python as well, so it shares one spawned
+                # process pool with the parsing of the PDFs that have outlines
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    futures = []
+                    for pdf_file in missing:
+                        logger.warning("⚠️  No outline found for %s, attempting to generate outline...", pdf_file)
+                        futures.append(executor.submit(_generate_and_extract_worker, os.path.join(input_dir, pdf_file)))
+                    extracted = self.content_segmenter.process_documents(pairs, workers=workers, executor=executor)
+                    generated = [self._collect_generated(pdf_file, future, output_dir)
+                                 for pdf_file, future in zip(missing, futures)]
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # Outline generation runs on threads while the process pool parses the rest
+                    generated = executor.map(lambda pdf_file: self._generate_and_extract(pdf_file, input_dir, output_dir),
+                                             missing)
+                    # Parsing is CPU-bound and the PDFs are independent, so use worker processes
+                    extracted = self.content_segmenter.process_documents(pairs, workers=workers)
+                    generated = list(generated)
+            
+            # Reassemble in pdf_files order
+            extracted_iter = iter(extracted)
+            generated_iter = iter(generated)
+            for pdf_file, outline_path in zip(pdf_files, outline_paths):
                 if outline_path:
-                    # Extract content using Round 1A outline
-                    sections = self.content_segmenter.process_document(pdf_path, outline_path)
-                    all_sections.extend(sections)
-                    print(f"✅ Extracted {len(sections)} sections from {pdf_file}")
+                    sections = next(extracted_iter)
+                    logger.info("✅ Extracted %s sections from %s", len(sections), pdf_file)
                 else:
-                    print(f"⚠️  No outline found for {pdf_file}, attempting to generate outline...")
-                    # Try to generate outline using Round 1A approach
-                    try:
-                        from main import process_pdf
-                        outline_data = process_pdf(pdf_path)
-                        outline_path = os.path.join(output_dir, os.path.splitext(pdf_file)[0] + ".json")
-                        with open(outline_path, 'w', encoding='utf-8') as f:
-                            json.dump(outline_data, f, indent=2, ensure_ascii=False)
-                        
-                        # Now extract content
-                        sections = self.content_segmenter.process_document(pdf_path, outline_path)
-                        all_sections.extend(sections)
-                        print(f"✅ Generated outline and extracted {len(sections)} sections from {pdf_file}")
-                    except Exception as e:
-                        print(f"❌ Failed to generate outline for {pdf_file}: {e}")
-            
-            print(f"📊 Total sections extracted: {len(all_sections)}")
+                    sections = next(generated_iter)
+                all_sections.extend(sections)
+            
+            logger.info("📊 Total sections extracted: %s", len(all_sections))
             return all_sections
             
         except Exception as e:
-            print(f"❌ Error processing documents: {e}")
+            logger.error("❌ Error processing documents: %s", e)
             raise
+        finally:
+            # Generated outlines are on disk by the time Stage 1 returns
+            self._write_queue.join()
     
     def create_semantic_embeddings(self, sections: List[Dict[str, Any]], 
-                                 persona_text: str, jbtd_text: str) -> tuple:
+                                 persona_text: str, jbtd_text: str,
+                                 query_embedding: np.ndarray = None) -> tuple:
         """
         Stage 2: Create semantic embeddings for query and content.
         
@@ -192,42 +467,143 @@ class PersonaDrivenDocumentIntelligence:
             sections: List of extracted sections
             persona_text: User persona description
             jbtd_text: Job-to-be-done description
+            query_embedding: Query embedding computed ahead of time (created here if not provided)
             
         Returns:
             Tuple of (query_embedding, content_embeddings)
         """
-        print("🧠 Stage 2: Creating semantic embeddings...")
+        logger.info("🧠 Stage 2: Creating semantic embeddings...")
         
         try:
-            # Create query embedding
-            query_embedding = self.semantic_embedder.create_query_embedding(persona_text, jbtd_text)
+            if query_embedding is None:
+                query_embedding = self.create_query_embedding(persona_text, jbtd_text)
             
-            # Create content embeddings
-            content_embeddings = self.semantic_embedder.create_content_embeddings(sections)
+            content_embeddings = self._content_embeddings(sections, self._content_cache_path(sections))
             
             return query_embedding, content_embeddings
             
         except Exception as e:
-            print(f"❌ Error creating embeddings: {e}")
+            logger.error("❌ Error creating embeddings: %s", e)
             raise
     
+    def quantized_content_embeddings(self, sections: List[Dict[str, Any]]) -> tuple:
+        """
+        Stage 2 (quantized): Create int8 content embeddings for the ranking pass.
+        
+        Args:
+            sections: List of extracted sections
+            
+        Returns:
+            Tuple of (int8 matrix, scales) from quantize_int8
+        """
+        logger.info("🧠 Stage 2: Creating quantized semantic embeddings...")
+        
+        try:
+            # The quantized matrix is cached next to the float one, so a repeat run over
+            # the same corpus memory-maps the ranking inputs directly
+            content_path = self._content_cache_path(sections)
+            q8_path = content_path[:-len('.npy')] + '.q8.npy'
+            scales_path = content_path[:-len('.npy')] + '.scales.npy'
+            content_q8 = self._load_cached_embedding(q8_path)
+            scales = self._load_cached_embedding(scales_path)
+            if content_q8 is not None and scales is not None:
+                logger.info("♻️  Reusing cached quantized embeddings for %s sections", len(sections))
+                return content_q8, scales
+            
+            content_q8, scales = self._quantize_int8(self._content_embeddings(sections, content_path))
+            # Scales first: the q8 file is only trusted when its scales exist too
+            scales = self._save_cached_embedding(scales_path, scales)
+            content_q8 = self._save_cached_embedding(q8_path, content_q8)
+            return content_q8, scales
+            
+        except Exception as e:
+            logger.error("❌ Error creating quantized embeddings: %s", e)
+            raise
+    
+    def _content_cache_path(self, sections: List[Dict[str, Any]]) -> str:
+        """Cache file for the content embeddings of sections."""
+        return self._embedding_cache_path('content_emb', (section.get('content_text', '') for section in sections))
+    
+    def _content_embeddings(self, sections: List[Dict[str, Any]], content_path: str) -> np.ndarray:
+        """Create content embeddings, reusing cached ones for an unchanged corpus."""
+        content_embeddings = self._load_cached_embedding(content_path)
+        if content_embeddings is None:
+            content_embeddings = self.semantic_embedder.create_content_embeddings(sections)
+            content_embeddings = self._save_cached_embedding(content_path, content_embeddings)
+        else:
+            logger.info("♻️  Reusing cached embeddings for %s sections", len(sections))
+        return content_embeddings
+    
+    def create_query_embedding(self, persona_text: str, jbtd_text: str) -> np.ndarray:
+        """Create the query embedding, reusing a cached one for a repeated persona/JBTD."""
+        query_path = self._embedding_cache_path('query_emb', (persona_text, jbtd_text))
+        query_embedding = self._load_cached_embedding(query_path)
+        if query_embedding is None:
+            query_embedding = self.semantic_embedder.create_query_embedding(persona_text, jbtd_text)
+            query_embedding = self._save_cached_embedding(query_path, query_embedding)
+        else:
+            logger.info("♻️  Reusing cached query embedding")
+        return query_embedding
+    
+    def _embedding_cache_path(self, kind: str, texts) -> str:
+        """Cache file for the embeddings of texts, keyed by their content and the model."""
+        model_info = self.semantic_embedder.get_model_info()
+        digest = hashlib.blake2b(digest_size=16)
+        for text in texts:
+            digest.update(text.encode('utf-8'))
+            digest.update(b'\x1e')
+        # Embeddings are unit-length; the suffix keeps pre-normalization cache files out
+        digest.update(f"{model_info.get('model_name')}:{model_info.get('embedding_dimension')}:"
+                      f"{self.semantic_embedder.backend}:normalized".encode('utf-8'))
+        return os.path.join(self.cache_dir, kind, f"{digest.hexdigest()}.npy")
+    
+    def _load_cached_embedding(self, path: str):
+        """Memory-map a cached embedding array, or return None when it is missing or unreadable."""
+        try:
+            return self._np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+    
+    def _save_cached_embedding(self, path: str, embedding: np.ndarray) -> np.ndarray:
+        """
+        Atomically write an embedding array to the cache and memory-map it back.
+        
+        Handing later stages the file-backed array means every consumer shares one
+        page-cache buffer. If the cache cannot be written the in-memory array is returned.
+        """
+        np = self._np
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.asarray(embedding))
+            os.replace(tmp_path, path)
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            logger.warning("⚠️  Could not cache embeddings at %s: %s", path, e)
+            return embedding
+    
     def perform_ranking_analysis(self, sections: List[Dict[str, Any]], 
-                               query_embedding: np.ndarray) -> tuple:
+                               query_embedding: np.ndarray,
+                               content_embeddings: np.ndarray = None) -> tuple:
         """
         Stage 3: Perform multi-level ranking analysis.
         
         Args:
             sections: List of extracted sections
             query_embedding: Query embedding vector
+            content_embeddings: Section embeddings (or quantized pair) from Stage 2, reused
+                instead of re-encoding
             
         Returns:
             Tuple of (ranked_sections, sub_section_results)
         """
-        print("🏆 Stage 3: Performing ranking analysis...")
+        logger.info("🏆 Stage 3: Performing ranking analysis...")
         
         try:
             # Stage 1: Rank all sections
-            ranked_sections = self.ranking_engine.rank_sections(sections, query_embedding)
+            ranked_sections = self.ranking_engine.rank_sections(sections, query_embedding, content_embeddings,
+                                                                top_k=_MAX_OUTPUT_SECTIONS)
             
             # Stage 2: Analyze sub-sections
             sub_section_results = self.ranking_engine.analyze_sub_sections(ranked_sections, query_embedding)
@@ -235,7 +611,7 @@ class PersonaDrivenDocumentIntelligence:
             return ranked_sections, sub_section_results
             
         except Exception as e:
-            print(f"❌ Error performing ranking analysis: {e}")
+            logger.error("❌ Error performing ranking analysis: %s", e)
             raise
     
     def generate_output_json(self, ranked_sections: List[Dict[str, Any]], 
@@ -255,14 +631,14 @@ class PersonaDrivenDocumentIntelligence:
         Returns:
             Complete JSON output structure
         """
-        print("📝 Stage 4: Generating output JSON...")
+        logger.info("📝 Stage 4: Generating output JSON...")
         
         try:
-            # Format sections for output
-            output_sections = self.ranking_engine.get_top_sections_for_output(ranked_sections)
-            output_analysis = self.ranking_engine.get_sub_section_analysis_for_output(sub_section_results)
+            # Format sections and sub-sections for output in one pass
+            output_sections, output_analysis = self.ranking_engine.build_output_payload(
+                ranked_sections, sub_section_results, max_sections=_MAX_OUTPUT_SECTIONS)
             
-            # Create the complete output structure
+            # Wrap the payload with metadata, stamped once the payload is built
             output = {
                 "metadata": {
                     "input_documents": input_files,
@@ -275,11 +651,11 @@ class PersonaDrivenDocumentIntelligence:
                 "subsection_analysis": output_analysis
             }
             
-            print(f"✅ Generated output with {len(output_sections)} sections and {len(output_analysis)} sub-sections")
+            logger.info("✅ Generated output with %s sections and %s sub-sections", len(output_sections), len(output_analysis))
             return output
             
         except Exception as e:
-            print(f"❌ Error generating output: {e}")
+            logger.error("❌ Error generating output: %s", e)
             raise
     
     def run_pipeline(self, input_dir: str, output_dir: str, persona: str = None, jbtd: str = None) -> Dict[str, Any]:
@@ -296,46 +672,61 @@ class PersonaDrivenDocumentIntelligence:
             Complete analysis results
         """
         start_time = time.time()
-        print("🎯 Starting Persona-Driven Document Intelligence Pipeline...")
+        logger.info("🎯 Starting Persona-Driven Document Intelligence Pipeline...")
+        # Directory listings are shared by the stages of this run only, so files added
+        # between runs are always seen
+        self._pdf_files_cache = {}
         
         try:
             # Get persona and job-to-be-done from multiple sources
             input_data = self.get_persona_and_jbtd(persona, jbtd, input_dir)
             persona_text = input_data['persona']
             jbtd_text = input_data['jbtd']
+            self._last_persona, self._last_jbtd = persona_text, jbtd_text
             
-            # Get list of PDF files
-            pdf_files = [f for f in os.listdir(input_dir) if f.lower().endswith('.pdf')]
+            # Get list of PDF files (shared with Stage 1 so the directory is only listed once)
+            pdf_files, _ = self._list_input_dir(input_dir)
             
-            # Stage 1: Process documents
-            sections = self.process_documents(input_dir, output_dir)
+            # Stage 1: Process documents, encoding the query (which needs no PDFs) alongside
+            with ThreadPoolExecutor(max_workers=1) as query_executor:
+                query_future = query_executor.submit(self.create_query_embedding, persona_text, jbtd_text)
+                sections = self.process_documents(input_dir, output_dir, pdf_files)
+                query_embedding = query_future.result()
             
             if not sections:
-                print("⚠️  No sections extracted, creating minimal output")
+                logger.warning("⚠️  No sections extracted, creating minimal output")
                 return self.generate_output_json([], [], persona_text, jbtd_text, pdf_files)
             
-            # Stage 2: Create embeddings
-            query_embedding, _ = self.create_semantic_embeddings(sections, persona_text, jbtd_text)
+            # Stage 2: Create embeddings (the query stays float32; only the section matrix is
+            # shrunk for the ranking pass when quantization is enabled)
+            if self.quantize_embeddings:
+                content_embeddings = self.quantized_content_embeddings(sections)
+            else:
+                query_embedding, content_embeddings = self.create_semantic_embeddings(sections, persona_text,
+                                                                                      jbtd_text, query_embedding)
             
-            # Stage 3: Perform ranking
-            ranked_sections, sub_section_results = self.perform_ranking_analysis(sections, query_embedding)
+            # Stage 3: Perform ranking on the Stage 2 embeddings
+            ranked_sections, sub_section_results = self.perform_ranking_analysis(sections, query_embedding,
+                                                                                content_embeddings)
             
             # Stage 4: Generate output
             output = self.generate_output_json(ranked_sections, sub_section_results, 
                                              persona_text, jbtd_text, pdf_files)
             
             total_time = time.time() - start_time
-            print(f"🎉 Pipeline completed successfully in {total_time:.2f} seconds!")
+            logger.info("🎉 Pipeline completed successfully in %.2f seconds!", total_time)
             
             return output
             
         except Exception as e:
-            print(f"❌ Pipeline failed: {e}")
+            logger.error("❌ Pipeline failed: %s", e)
             raise
+        finally:
+            self._pdf_files_cache = None
 
-def main():
-    """Main execution function."""
-    import numpy as np
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Build the command line parser (only needed when arguments are given)."""
+    import argparse
     
     # Set up command line argument parsing
     parser = argparse.ArgumentParser(
@@ -384,7 +775,30 @@ Examples:
         help='Output directory path (default: ./output for local, /output for Docker)'
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        '--quant',
+        action='store_true',
+        help='Rank against int8-quantized content embeddings instead of float32 ones'
+    )
+    
+    parser.add_argument(
+        '--workers', '-w',
+        type=int,
+        default=None,
+        help='Number of PDFs processed concurrently (default: $R1B_WORKERS or CPU count)'
+    )
+    
+    return parser
+
+def main():
+    """Main execution function."""
+    if len(sys.argv) == 1:
+        # Plain `python main_round1b.py` (the Docker entrypoint): skip argparse entirely
+        args = SimpleNamespace(persona=None, jbtd=None, input_dir=None, output_dir=None,
+                               quant=False, workers=None)
+    else:
+        args = build_arg_parser().parse_args()
+    configure_logging()
     
     # Configuration - use relative paths for local testing, absolute for Docker
     current_dir = os.getcwd()
@@ -407,41 +821,44 @@ Examples:
         OUTPUT_DIR = "/output"
     
     # Print configuration
-    print("🔧 Configuration:")
-    print(f"   Input Directory: {INPUT_DIR}")
-    print(f"   Output Directory: {OUTPUT_DIR}")
+    logger.info("🔧 Configuration:")
+    logger.info("   Input Directory: %s", INPUT_DIR)
+    logger.info("   Output Directory: %s", OUTPUT_DIR)
     if args.persona:
-        print(f"   Persona: {args.persona}")
+        logger.info("   Persona: %s", args.persona)
     if args.jbtd:
-        print(f"   Job-to-be-Done: {args.jbtd}")
-    print()
+        logger.info("   Job-to-be-Done: %s", args.jbtd)
+    logger.info("")
     
+    system = None
     try:
         # Create output directory
         os.makedirs(OUTPUT_DIR, exist_ok=True)
         
         # Initialize the system
-        system = PersonaDrivenDocumentIntelligence()
+        system = PersonaDrivenDocumentIntelligence(max_workers=args.workers,
+                                                   quantize_embeddings=args.quant)
         
         # Run the pipeline with persona and jbtd arguments
         results = system.run_pipeline(INPUT_DIR, OUTPUT_DIR, args.persona, args.jbtd)
         
         # Save results
         output_path = os.path.join(OUTPUT_DIR, "output.json")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, indent=2, ensure_ascii=False)
+        write_json(output_path, results)
         
-        print(f"✅ Results saved to {output_path}")
+        logger.info("✅ Results saved to %s", output_path)
         
     except Exception as e:
-        print(f"❌ Execution failed: {e}")
+        logger.error("❌ Execution failed: %s", e)
         # Create minimal output on failure
         try:
             minimal_output = {
                 "metadata": {
                     "input_documents": [],
-                    "persona": args.persona or os.getenv('PERSONA', 'document analyst'),
-                    "job_to_be_done": args.jbtd or os.getenv('JBTD', 'extract relevant information'),
+                    "persona": (getattr(system, '_last_persona', None) or args.persona
+                                or os.getenv('PERSONA', 'document analyst')),
+                    "job_to_be_done": (getattr(system, '_last_jbtd', None) or args.jbtd
+                                       or os.getenv('JBTD', 'extract relevant information')),
                     "processing_timestamp": datetime.now().isoformat(),
                     "error": str(e)
                 },
@@ -450,13 +867,16 @@ Examples:
             }
             
             output_path = os.path.join(OUTPUT_DIR, "output.json")
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(minimal_output, f, indent=2, ensure_ascii=False)
+            write_json(output_path, minimal_output)
             
-            print(f"⚠️  Minimal output saved to {output_path}")
+            logger.warning("⚠️  Minimal output saved to %s", output_path)
             
         except Exception as save_error:
-            print(f"❌ Failed to save minimal output: {save_error}")
+            logger.error("❌ Failed to save minimal output: %s", save_error)
+    
+    finally:
+        if system is not None:
+            system.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+ONNX Runtime Sentence Encoder for Adobe Hackathon Round 1B
+Runs the int8-quantized all-MiniLM-L6-v2 export (written by download_model.py) with a
+SentenceTransformer-compatible encode(), doing mean pooling and L2 normalization in NumPy.
+"""
+
+import os
+import json
+import threading
+import numpy as np
+from typing import List, Union
+
+try:
+    import onnxruntime as ort
+    from transformers import AutoTokenizer
+except ImportError:
+    # Optional: callers fall back to the PyTorch SentenceTransformer
+    ort = None
+
+INT8_MODEL_FILE = os.path.join('onnx', 'model_int8.onnx')
+
+class OnnxSentenceEncoder:
+    """Drop-in replacement for the parts of SentenceTransformer the pipeline uses."""
+
+    def __init__(self, model_path: str, onnx_file: str = INT8_MODEL_FILE):
+        """
+        Load the tokenizer and ONNX graph saved under model_path.
+
+        Args:
+            model_path: Directory of the saved sentence-transformers model
+            onnx_file: ONNX graph inside model_path
+        """
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        # Fast tokenizers are not safe to call from several threads at once; the ONNX
+        # Runtime session is, so concurrent encode() calls only serialize tokenization
+        self._tokenizer_lock = threading.Lock()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(os.path.join(model_path, onnx_file), options,
+                                            providers=['CPUExecutionProvider'])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.max_seq_length = self._read_json(model_path, 'sentence_bert_config.json').get(
+            'max_seq_length', min(self.tokenizer.model_max_length, 512))
+        self._dimension = self._read_json(model_path, 'config.json').get('hidden_size')
+        # Match the saved pipeline: normalize only if it ends with a Normalize module
+        modules = self._read_json(model_path, 'modules.json')
+        self._normalize = any(module.get('type', '').endswith('Normalize') for module in modules)
+
+    @staticmethod
+    def _read_json(model_path: str, name: str):
+        """Read a JSON file from the model directory, or return {} when it is missing."""
+        try:
+            with open(os.path.join(model_path, name), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        """Size of the produced embeddings."""
+        return self._dimension
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, convert_to_numpy: bool = True,
+               convert_to_tensor: bool = False, normalize_embeddings: bool = False):
+        """
+        Encode sentences like SentenceTransformer.encode.
+
+        Args:
+            sentences: One sentence or a list of sentences
+            batch_size: Sentences per ONNX Runtime call
+            show_progress_bar: Accepted for compatibility; no progress bar is shown
+            convert_to_numpy: Accepted for compatibility; NumPy is the default output
+            convert_to_tensor: Return a torch tensor instead of a NumPy array
+            normalize_embeddings: L2-normalize even if the model has no Normalize module
+
+        Returns:
+            Embedding vector for a single sentence, else a (len(sentences), dim) matrix
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        if not sentences:
+            embeddings = np.empty((0, self._dimension or 0), dtype=np.float32)
+        else:
+            # Longest first, as sentence-transformers does, so each batch pads to similar lengths
+            order = np.argsort([-len(sentence) for sentence in sentences], kind='stable')
+            batches = [self._encode_batch([sentences[i] for i in order[start:start + batch_size]])
+                       for start in range(0, len(sentences), batch_size)]
+            embeddings = np.empty((len(sentences), batches[0].shape[1]), dtype=np.float32)
+            embeddings[order] = np.concatenate(batches)
+
+        if self._normalize or normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.maximum(norms, 1e-12)
+
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings)
+        return embeddings
+
+    def _encode_batch(self, batch: List[str]) -> np.ndarray:
+        """Run one batch through the graph and mean-pool the token embeddings."""
+        with self._tokenizer_lock:
+            features = self.tokenizer(batch, padding=True, truncation=True,
+                                      max_length=self.max_seq_length, return_tensors='np')
+        feeds = {name: value.astype(np.int64) for name, value in features.items()
+                 if name in self._input_names}
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        mask = features['attention_mask'][..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.maximum(mask.sum(axis=1), 1e-9)
+
+def load_onnx_encoder(model_path: str):
+    """
+    Load the int8 ONNX encoder for model_path when it has been exported.
+
+    Returns:
+        OnnxSentenceEncoder, or None when onnxruntime/transformers are missing or
+        download_model.py did not produce model_int8.onnx
+    """
+    if ort is None or not os.path.isfile(os.path.join(model_path, INT8_MODEL_FILE)):
+        return None
+    return OnnxSentenceEncoder(model_path)
@@ -1,16 +1,69 @@
 import fitz  # PyMuPDF
 import os
 import json
-from sentence_transformers import SentenceTransformer, util
+import atexit
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+import numpy as np
+from semantic_embedder import set_torch_threads, reduced_precision_encode
+from sentence_transformers import SentenceTransformer
+from onnx_encoder import load_onnx_encoder
+from embedding_cache import EmbeddingCache
+from fast_ops import assign_sections
+
+logger = logging.getLogger(__name__)
+if __name__ == '__main__':
+    # Progress messages are INFO, so they cost nothing unless LOGLEVEL asks for them
+    logging.basicConfig(level=os.environ.get('LOGLEVEL', 'WARNING').upper(), format='%(message)s')
 
 # --- Step 1: Load the pre-trained model ---
 # The first time this runs, it will download the model.
 # For Docker, the model must be included in the image to work offline.
-print("Loading sentence transformer model...")
+logger.info("Loading sentence transformer model...")
 # The model will be located at this path *inside* the Docker image
 model_path = '/app/local_model'
-model = SentenceTransformer(model_path)
-print("Model loaded.")
+set_torch_threads()
+# Prefer the int8 ONNX export written by download_model.py; fall back to the FP32 model
+model = load_onnx_encoder(model_path)
+if model is None:
+    model = SentenceTransformer(model_path)
+    # FP16 on GPU / BF16 on AVX-512 BF16 CPUs; ADOBE_REDUCED_PRECISION=0 keeps FP32
+    encode, precision = reduced_precision_encode(model)
+    logger.info("Model loaded (%s).", precision)
+else:
+    encode, precision = model.encode, "int8"
+    logger.info("Model loaded (int8 ONNX).")
+# Embeddings of texts seen in earlier runs are reused instead of re-encoded
+embedding_cache = EmbeddingCache(f"{model_path}:{type(model).__name__}:{precision}")
+
+# Text extraction flags shared by the dict and blocks passes: the default flags minus images
+_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Recently opened documents, so repeated calls for a PDF skip re-parsing its xref and catalog.
+# Module state, so every worker process keeps its own handles.
+_MAX_OPEN_DOCS = 16
+_open_docs = OrderedDict()
+
+
+def _open_doc(pdf_path):
+    """Open pdf_path, reusing the handle from an earlier call while the file is unchanged."""
+    key = (os.path.abspath(pdf_path), os.stat(pdf_path).st_mtime_ns)
+    doc = _open_docs.get(key)
+    if doc is not None:
+        _open_docs.move_to_end(key)
+        return doc
+    doc = fitz.open(pdf_path)
+    _open_docs[key] = doc
+    if len(_open_docs) > _MAX_OPEN_DOCS:
+        _open_docs.popitem(last=False)[1].close()
+    return doc
+
+
+@atexit.register
+def _close_open_docs():
+    while _open_docs:
+        _open_docs.popitem()[1].close()
 
 
 def extract_text_chunks(pdf_path):
@@ -18,24 +71,37 @@ def extract_text_chunks(pdf_path):
     Extracts structured text chunks (title, content, page) from a PDF.
     This function is from our previous step.
     """
-    doc = fitz.open(pdf_path)
+    doc = _open_doc(pdf_path)
     doc_name = os.path.basename(pdf_path)
     chunks = []
     
+    # Phase 1: parse every page once, keeping both layouts for the passes below.
+    # PyMuPDF documents are not thread-safe, so pages are read sequentially.
+    # One text page per page serves both layouts, and without image blocks the dict
+    # output carries no image bytes (these are the flags "blocks" mode uses anyway)
+    page_dict_blocks = []
+    page_text_blocks = []
+    for page in doc:
+        textpage = page.get_textpage(flags=_TEXT_FLAGS)
+        page_dict_blocks.append(page.get_text("dict", textpage=textpage)["blocks"])
+        page_text_blocks.append(page.get_text("blocks", textpage=textpage))
+
     headings = []
-    for page_num, page in enumerate(doc):
-        blocks = page.get_text("dict")["blocks"]
+    for page_num, blocks in enumerate(page_dict_blocks):
         for block in blocks:
             if block["type"] == 0:
                 for line in block["lines"]:
-                    if line["spans"]:
-                        first_span = line["spans"][0]
-                        if len(line["spans"]) == 1 and first_span["size"] > 13:
-                            headings.append({
-                                "title": first_span["text"].strip(),
-                                "page": page_num,
-                                "y_pos": line["bbox"][1]
-                            })
+                    spans = line["spans"]
+                    # Headings are single-span lines; skip everything else before touching spans
+                    if len(spans) != 1:
+                        continue
+                    first_span = spans[0]
+                    if first_span["size"] > 13:
+                        headings.append({
+                            "title": first_span["text"].strip(),
+                            "page": page_num,
+                            "y_pos": line["bbox"][1]
+                        })
 
     if not headings:
         full_text = "".join(page.get_text() for page in doc)
@@ -45,22 +111,27 @@ def extract_text_chunks(pdf_path):
         })
         return chunks
 
-    for i, heading in enumerate(headings):
-        start_page, start_y = heading["page"], heading["y_pos"]
-        end_page = headings[i+1]["page"] if i + 1 < len(headings) else len(doc) - 1
-        end_y = headings[i+1]["y_pos"] if i + 1 < len(headings) else 9999
-
-        section_content = ""
-        for page_num in range(start_page, end_page + 1):
-            page = doc[page_num]
-            text_blocks = page.get_text("blocks")
-            for block in text_blocks:
-                block_y = block[1]
-                is_after_start = (page_num > start_page) or (page_num == start_page and block_y > start_y)
-                is_before_end = (page_num < end_page) or (page_num == end_page and block_y < end_y)
-                if is_after_start and is_before_end:
-                    section_content += block[4]
-        
+    # Phase 2: a section runs from its heading to the next one in reading order. The block
+    # positions go into flat arrays and one compiled sweep finds each block's section
+    # (strictly between two heading positions), instead of walking the dicts per heading
+    headings.sort(key=lambda heading: (heading["page"], heading["y_pos"]))
+    block_texts = [block[4] for blocks in page_text_blocks for block in blocks]
+    block_pages = np.fromiter((page_num for page_num, blocks in enumerate(page_text_blocks) for _ in blocks),
+                              dtype=np.int64, count=len(block_texts))
+    block_ys = np.fromiter((block[1] for blocks in page_text_blocks for block in blocks),
+                           dtype=np.float64, count=len(block_texts))
+    owners = assign_sections(block_pages, block_ys,
+                             np.array([heading["page"] for heading in headings], dtype=np.int64),
+                             np.array([heading["y_pos"] for heading in headings], dtype=np.float64),
+                             len(doc) - 1, 9999)
+    # A stable sort groups each section's blocks contiguously (unowned ones first) while
+    # keeping reading order, so every section is one join over a slice of the block texts
+    order = np.argsort(owners, kind='stable')
+    bounds = np.searchsorted(owners[order], np.arange(len(headings) + 1)).tolist()
+    order = order.tolist()
+
+    for heading, start, stop in zip(headings, bounds, bounds[1:]):
+        section_content = "".join([block_texts[i] for i in order[start:stop]])
         chunks.append({
             "doc_name": doc_name, "page_num": heading["page"],
             "section_title": heading["title"], "content": f"{heading['title']}\n{section_content.strip()}"
@@ -68,31 +139,50 @@ def extract_text_chunks(pdf_path):
     return chunks
 
 
-def rank_chunks_by_relevance(query, chunks):
+@lru_cache(maxsize=128)
+def _encode_query(query):
+    """Normalized query embedding, kept in memory so repeated queries skip even the cache lookup."""
+    embedding = embedding_cache.cached_encode(encode, [query], show_progress_bar=False)[0]
+    embedding = embedding / max(np.linalg.norm(embedding), 1e-12)
+    # Shared between callers, so it must not be modified in place
+    embedding.setflags(write=False)
+    return embedding
+
+
+def rank_chunks_by_relevance(query, chunks, top_k=None):
     """
-    Ranks text chunks based on their semantic similarity to a query
-    using the optimized semantic_search function.
+    Ranks text chunks based on their cosine similarity to a query.
+    Only the top_k best chunks are ordered and returned when top_k is given.
     """
+    if not chunks:
+        return []
     chunk_contents = [chunk['content'] for chunk in chunks]
     
-    print("Generating embeddings...")
-    # Generate embeddings for all chunks at once
-    chunk_embeddings = model.encode(chunk_contents, convert_to_tensor=True)
+    logger.info("Generating embeddings...")
+    query_embedding = _encode_query(query)
+    chunk_embeddings = embedding_cache.cached_encode(encode, chunk_contents,
+                                                     batch_size=64, show_progress_bar=False)
+    # L2-normalize once so a single matmul gives every chunk's cosine similarity. The matrix
+    # is a fresh copy, so divide in place; zero rows are masked out instead of clamped
+    norms = np.sqrt(np.einsum('ij,ij->i', chunk_embeddings, chunk_embeddings))[:, None]
+    np.divide(chunk_embeddings, norms, out=chunk_embeddings, where=norms > 0)
     
-    print("Performing semantic search...")
-    # Use the optimized semantic_search to find the top k most similar chunks
-    # We ask for all chunks (len(chunks)) and it will return them ranked.
-    hits = util.semantic_search(model.encode(query), chunk_embeddings, top_k=len(chunks))
-    
-    # The output is a list of lists, we only need the first list for our single query
-    hits = hits[0] 
+    logger.info("Scoring chunks...")
+    scores = chunk_embeddings @ query_embedding
+    if top_k is not None and top_k < len(scores):
+        # Select every chunk scoring at least the top_k-th score in O(N) (ties included, in
+        # input order), then sort just those
+        kth_score = -np.partition(-scores, top_k - 1)[top_k - 1]
+        candidates = np.flatnonzero(scores >= kth_score)
+        order = candidates[np.argsort(-scores[candidates], kind='stable')][:top_k]
+    else:
+        order = np.argsort(-scores, kind='stable')
     
-    # --- Re-order our original chunks based on the search results ---
+    # --- Re-order our original chunks by score ---
     ranked_chunks = []
-    for hit in hits:
-        # Get the original chunk using the index from the search result
-        original_chunk = chunks[hit['corpus_id']]
-        original_chunk['score'] = hit['score']
+    for idx in order:
+        original_chunk = chunks[idx]
+        original_chunk['score'] = float(scores[idx])
         ranked_chunks.append(original_chunk)
         
     return ranked_chunks
@@ -109,7 +199,7 @@ if __name__ == '__main__':
     for filename in os.listdir(pdf_directory):
         if filename.lower().endswith(".pdf"):
             pdf_path = os.path.join(pdf_directory, filename)
-            print(f"Processing {pdf_path}...")
+            logger.info("Processing %s...", pdf_path)
             chunks = extract_text_chunks(pdf_path)
             all_document_chunks.extend(chunks)
 
@@ -121,11 +211,11 @@ if __name__ == '__main__':
         query = f"Persona: {persona}. Job: {job_to_be_done}"
 
         # Get the ranked list of chunks
-        ranked_results = rank_chunks_by_relevance(query, all_document_chunks)
+        ranked_results = rank_chunks_by_relevance(query, all_document_chunks, top_k=5)
         
         # --- Display the top 5 most relevant sections ---
         print("\n--- Top 5 Most Relevant Sections ---")
-        for i, result in enumerate(ranked_results[:5]):
+        for i, result in enumerate(ranked_results):
             print(f"Rank {i+1}: Score: {result['score']:.4f}")
             print(f"  Document: {result['doc_name']}, Page: {result['page_num']}")
             print(f"  Section: {result['section_title']}")
@@ -7,27 +7,58 @@ Implements two-stage hierarchical analysis for section and sub-section relevance
 import numpy as np
 from typing import List, Dict, Any, Tuple
 import re
+import logging
+from collections import Counter
 from semantic_embedder import SemanticEmbedder
 
+logger = logging.getLogger(__name__)
+
+# Paragraph boundary for sub-section chunks: a line break, optional blank lines, a line break
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+# Minimum meaningful chunk length in characters
+_MIN_CHUNK_LENGTH = 50
+# Refined-text caps in characters: best chunk, and raw content when a section has no chunks
+_MAX_REFINED = 1000
+_MAX_FALLBACK = 500
+# With drop_boilerplate, a chunk repeated verbatim in this many analyzed sections is treated
+# as boilerplate (running footers, disclaimers, contact blocks) and is not encoded or returned
+_BOILERPLATE_MIN_SECTIONS = 3
+
 class RankingEngine:
     """Implements hierarchical ranking for document sections and sub-sections."""
     
-    def __init__(self, embedder: SemanticEmbedder):
+    def __init__(self, embedder: SemanticEmbedder, drop_boilerplate: bool = False):
         """
         Initialize the ranking engine.
         
         Args:
             embedder: SemanticEmbedder instance for creating embeddings
+            drop_boilerplate: Leave chunks repeated in many analyzed sections out of the
+                sub-section analysis (changes its output, so off by default)
         """
         self.embedder = embedder
+        self.drop_boilerplate = drop_boilerplate
     
-    def rank_sections(self, sections: List[Dict[str, Any]], query_embedding: np.ndarray) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _normalize_query(query_embedding: np.ndarray) -> np.ndarray:
+        """Return the query as a float32 unit vector (unchanged when its norm is 0)."""
+        # Normalized on every call: it is one vector, and nothing stale can be returned
+        # when a caller reuses an array with new contents
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.sqrt(np.vdot(query, query))
+        return query / norm if norm > 0 else query
+    
+    def rank_sections(self, sections: List[Dict[str, Any]], query_embedding: np.ndarray,
+                      content_embeddings: np.ndarray = None, top_k: int = None) -> List[Dict[str, Any]]:
         """
         Stage 1: Rank all sections by relevance to the query.
         
         Args:
             sections: List of section dictionaries
             query_embedding: Query embedding vector
+            content_embeddings: Precomputed section embeddings or their quantize_int8 pair
+                (created here if not provided)
+            top_k: Only rank and return the top_k sections (default: all)
             
         Returns:
             List of ranked sections with importance_rank
@@ -35,37 +66,44 @@ class RankingEngine:
         if not sections:
             return []
         
-        print("🏆 Stage 1: Ranking sections by relevance...")
+        logger.info("🏆 Stage 1: Ranking sections by relevance...")
         
         try:
-            # Create embeddings for all sections
-            content_embeddings = self.embedder.create_content_embeddings(sections)
+            query_embedding = self._normalize_query(query_embedding)
+            
+            # Create embeddings for all sections unless the caller already has them
+            if content_embeddings is None:
+                content_embeddings = self.embedder.create_content_embeddings(sections)
             
             # Compute similarities
             similarities = self.embedder.compute_cosine_similarities(query_embedding, content_embeddings)
             
-            # Combine sections with their scores
-            ranked_sections = []
-            for i, section in enumerate(sections):
-                ranked_section = section.copy()
-                ranked_section['relevance_score'] = float(similarities[i])
-                ranked_sections.append(ranked_section)
+            # Sort by relevance score (descending) in one C-level pass; the stable sort keeps
+            # tied sections in input order
+            if top_k is not None and top_k < len(similarities):
+                # Only the top_k are needed: select every section scoring at least the top_k-th
+                # score in O(N) (ties included, in input order), then sort just those
+                kth_score = -np.partition(-similarities, top_k - 1)[top_k - 1]
+                candidates = np.flatnonzero(similarities >= kth_score)
+                order = candidates[np.argsort(-similarities[candidates], kind='stable')][:top_k]
+            else:
+                order = np.argsort(-similarities, kind='stable')
             
-            # Sort by relevance score (descending)
-            ranked_sections.sort(key=lambda x: x['relevance_score'], reverse=True)
+            # Only the ranked sections (top_k of them when given) are copied, each built in one
+            # dict display with its score and importance rank (1-indexed); the caller's
+            # sections are left untouched
+            scores = similarities[order].tolist()
+            ranked_sections = [{**sections[i], 'relevance_score': score, 'importance_rank': rank}
+                               for rank, (i, score) in enumerate(zip(order.tolist(), scores), start=1)]
             
-            # Add importance rank (1-indexed)
-            for i, section in enumerate(ranked_sections):
-                section['importance_rank'] = i + 1
-            
-            print(f"✅ Ranked {len(ranked_sections)} sections")
+            logger.info("✅ Ranked %s sections", len(ranked_sections))
             top_scores = [f"{s['relevance_score']:.4f}" for s in ranked_sections[:3]]
-            print(f"📊 Top 3 scores: {top_scores}")
+            logger.info("📊 Top 3 scores: %s", top_scores)
             
             return ranked_sections
             
         except Exception as e:
-            print(f"❌ Error ranking sections: {e}")
+            logger.error("❌ Error ranking sections: %s", e)
             raise
     
     def chunk_text(self, text: str) -> List[str]:
@@ -78,37 +116,30 @@ class RankingEngine:
         Returns:
             List of text chunks
         """
-        # Split by double newlines (paragraphs)
-        chunks = re.split(r'\n\s*\n', text.strip())
-        
-        # Filter out empty chunks and very short chunks
-        valid_chunks = []
-        for chunk in chunks:
-            chunk = chunk.strip()
-            if len(chunk) > 50:  # Minimum meaningful length
-                valid_chunks.append(chunk)
+        # Split by blank lines (paragraphs), dropping empty and very short chunks.
+        # No separate line-based fallback is needed: it groups lines by the same blank lines
+        # and joins them with single spaces, so its chunks are never longer than these ones
+        # and it cannot find a chunk that passes the length filter when this split found none.
+        return [chunk for chunk in (chunk.strip() for chunk in _PARAGRAPH_RE.split(text.strip()))
+                if len(chunk) > _MIN_CHUNK_LENGTH]
+    
+    def _drop_boilerplate(self, section_chunks: List[List[str]]) -> List[List[str]]:
+        """
+        Remove chunks shared verbatim by many sections before they reach the encoder.
         
-        # If no valid chunks found, split by single newlines
-        if not valid_chunks:
-            lines = text.split('\n')
-            current_chunk = []
-            for line in lines:
-                line = line.strip()
-                if line:
-                    current_chunk.append(line)
-                elif current_chunk:
-                    chunk_text = ' '.join(current_chunk)
-                    if len(chunk_text) > 50:
-                        valid_chunks.append(chunk_text)
-                    current_chunk = []
-            
-            # Add the last chunk if it exists
-            if current_chunk:
-                chunk_text = ' '.join(current_chunk)
-                if len(chunk_text) > 50:
-                    valid_chunks.append(chunk_text)
+        A section made up only of boilerplate keeps its chunks, so it still gets a result.
+        """
+        section_counts = Counter(chunk for chunks in section_chunks for chunk in set(chunks))
+        boilerplate = {chunk for chunk, count in section_counts.items() if count >= _BOILERPLATE_MIN_SECTIONS}
+        if not boilerplate:
+            return section_chunks
         
-        return valid_chunks
+        filtered = []
+        for chunks in section_chunks:
+            kept = [chunk for chunk in chunks if chunk not in boilerplate]
+            filtered.append(kept or chunks)
+        logger.debug("Dropped %s boilerplate chunk(s) before sub-section encoding", len(boilerplate))
+        return filtered
     
     def analyze_sub_sections(self, top_sections: List[Dict[str, Any]], query_embedding: np.ndarray, 
                            max_sections: int = 20) -> List[Dict[str, Any]]:
@@ -126,19 +157,35 @@ class RankingEngine:
         if not top_sections:
             return []
         
-        print(f"🔍 Stage 2: Analyzing sub-sections in top {min(max_sections, len(top_sections))} sections...")
+        logger.info("🔍 Stage 2: Analyzing sub-sections in top %s sections...", min(max_sections, len(top_sections)))
         
         try:
             sub_section_results = []
             sections_to_analyze = top_sections[:max_sections]
             
-            for section in sections_to_analyze:
-                # Chunk the section content
-                chunks = self.chunk_text(section['content_text'])
-                
+            # Chunk every section, then encode all chunks in one call: sentence-transformers
+            # sorts its input by length, so batches pair similar-length chunks across sections
+            # instead of each small per-section batch padding to its own longest chunk
+            section_chunks = [self.chunk_text(section['content_text']) for section in sections_to_analyze]
+            if self.drop_boilerplate:
+                section_chunks = self._drop_boilerplate(section_chunks)
+            all_chunks = [chunk for chunks in section_chunks for chunk in chunks]
+            all_chunk_embeddings = self.embedder.create_chunk_embeddings(all_chunks)
+            # Score every chunk against the query in one pass; each section takes its slice.
+            # Chunk embeddings are unit-length and the query is normalized here, so one
+            # matrix-vector product gives the cosine similarities without a norm pass
+            if all_chunks:
+                all_chunk_similarities = all_chunk_embeddings @ self._normalize_query(query_embedding)
+            else:
+                all_chunk_similarities = np.empty(0, dtype=np.float32)
+            offset = 0
+            
+            for section, chunks in zip(sections_to_analyze, section_chunks):
                 if not chunks:
                     # If no valid chunks, use the original content
-                    refined_text = section['content_text'][:500] + "..." if len(section['content_text']) > 500 else section['content_text']
+                    content_text = section['content_text']
+                    refined_text = (content_text if len(content_text) <= _MAX_FALLBACK
+                                    else content_text[:_MAX_FALLBACK] + "...")
                     sub_section_results.append({
                         'doc_name': section['doc_name'],
                         'page_number': section['page_num'],
@@ -146,21 +193,18 @@ class RankingEngine:
                     })
                     continue
                 
-                # Create embeddings for chunks
-                chunk_embeddings = self.embedder.create_chunk_embeddings(chunks)
-                
-                # Compute similarities for chunks
-                chunk_similarities = self.embedder.compute_cosine_similarities(query_embedding, chunk_embeddings)
+                # This section's scores among the shared chunk similarities
+                chunk_similarities = all_chunk_similarities[offset:offset + len(chunks)]
+                offset += len(chunks)
                 
                 # Find the best chunk
-                best_chunk_idx = np.argmax(chunk_similarities)
+                best_chunk_idx = int(np.argmax(chunk_similarities))
                 best_chunk = chunks[best_chunk_idx]
                 best_score = chunk_similarities[best_chunk_idx]
                 
-                # Create refined text (limit length for output)
-                refined_text = best_chunk
-                if len(refined_text) > 1000:
-                    refined_text = refined_text[:1000] + "..."
+                # Create refined text (limit length for output), slicing only when over the cap
+                refined_text = (best_chunk if len(best_chunk) <= _MAX_REFINED
+                                else best_chunk[:_MAX_REFINED] + "...")
                 
                 sub_section_results.append({
                     'doc_name': section['doc_name'],
@@ -169,12 +213,12 @@ class RankingEngine:
                     'chunk_score': float(best_score)
                 })
             
-            print(f"✅ Analyzed sub-sections for {len(sub_section_results)} sections")
+            logger.info("✅ Analyzed sub-sections for %s sections", len(sub_section_results))
             
             return sub_section_results
             
         except Exception as e:
-            print(f"❌ Error analyzing sub-sections: {e}")
+            logger.error("❌ Error analyzing sub-sections: %s", e)
             raise
     
     def get_top_sections_for_output(self, ranked_sections: List[Dict[str, Any]], 
@@ -189,19 +233,12 @@ class RankingEngine:
         Returns:
             List of sections formatted for output
         """
-        top_sections = ranked_sections[:max_sections]
-        
-        output_sections = []
-        for section in top_sections:
-            output_section = {
-                'document': section['doc_name'],
-                'page_number': section['page_num'],
-                'section_title': section['heading_text'],
-                'importance_rank': section['importance_rank']
-            }
-            output_sections.append(output_section)
-        
-        return output_sections
+        return [{
+            'document': section['doc_name'],
+            'page_number': section['page_num'],
+            'section_title': section['heading_text'],
+            'importance_rank': section['importance_rank']
+        } for section in ranked_sections[:max_sections]]
     
     def get_sub_section_analysis_for_output(self, sub_section_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -213,19 +250,33 @@ class RankingEngine:
         Returns:
             List of sub-section analysis formatted for output
         """
-        output_analysis = []
-        for result in sub_section_results:
-            output_item = {
-                'document': result['doc_name'],
-                'page_number': result['page_number'],
-                'refined_text': result['refined_text']
-            }
-            output_analysis.append(output_item)
+        return [{
+            'document': result['doc_name'],
+            'page_number': result['page_number'],
+            'refined_text': result['refined_text']
+        } for result in sub_section_results]
+    
+    def build_output_payload(self, ranked_sections: List[Dict[str, Any]],
+                             sub_section_results: List[Dict[str, Any]],
+                             max_sections: int = 50) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Format ranked sections and sub-section results for JSON output.
         
-        return output_analysis
+        Args:
+            ranked_sections: All ranked sections
+            sub_section_results: Results from sub-section analysis
+            max_sections: Maximum number of sections to include
+            
+        Returns:
+            Tuple of (output_sections, output_analysis)
+        """
+        return (self.get_top_sections_for_output(ranked_sections, max_sections),
+                self.get_sub_section_analysis_for_output(sub_section_results))
 
 def main():
     """Test the ranking engine."""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     from semantic_embedder import SemanticEmbedder
     
     # Initialize embedder
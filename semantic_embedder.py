@@ -4,12 +4,111 @@ Semantic Embedding Module for Adobe Hackathon Round 1B
 Converts text to semantic vectors using all-MiniLM-L6-v2 model for offline use.
 """
 
-import numpy as np
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Tuple
 import os
+import logging
+
+# Intra-op threads for torch inference, applied by set_torch_threads when a model loads;
+# containers often default to far fewer threads than the CPUs available
+# (override: ADOBE_TORCH_THREADS)
+TORCH_THREADS = int(os.getenv("ADOBE_TORCH_THREADS") or os.cpu_count() or 1)
+
+import numpy as np
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import time
 
+from fast_ops import cosine_batch
+from embedding_cache import EmbeddingCache
+from onnx_encoder import load_onnx_encoder
+
+if TYPE_CHECKING:
+    # Only named in annotations; sentence-transformers is imported when a model loads
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger(__name__)
+
+# Encoder progress bars are one terminal write per batch; only shown when VERBOSE is set
+SHOW_PROGRESS = bool(os.environ.get("VERBOSE"))
+
+def quantize_int8(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantize embedding rows to int8 with one symmetric scale per row.
+    
+    Args:
+        embeddings: Matrix of float embeddings
+        
+    Returns:
+        Tuple of (int8 matrix, per-row float32 scales) with embeddings ~= q8 * scales[:, None]
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    # max|x| per row from the row max/min, without materializing an abs() copy
+    scales = np.maximum(embeddings.max(axis=1), -embeddings.min(axis=1)) / np.float32(127.0)
+    # All-zero rows keep a unit scale so they quantize to zeros instead of NaNs
+    scales[scales == 0] = 1.0
+    # One float temporary, rounded in place, then narrowed to int8
+    scaled = embeddings / scales[:, None]
+    np.rint(scaled, out=scaled)
+    return scaled.astype(np.int8), scales
+
+# Concurrent encode() calls for large batches; the intra-op threads are divided among them
+EMBED_WORKERS = max(1, int(os.getenv("EMBED_WORKERS") or (os.cpu_count() or 1) // 2))
+
+# Below this many texts a single encode() call is used
+_PARALLEL_ENCODE_MIN_TEXTS = 256
+
+# Texts per forward pass: small batches keep MiniLM's activations cache-resident on CPU,
+# while a GPU needs wide batches to fill its cores
+_CPU_BATCH_SIZE = 16
+_CUDA_BATCH_SIZE = 64
+
+# Loaded models per absolute model path -> (model, backend, batch size), so every embedder
+# in the process shares one set of weights and one inference session
+_shared_models = {}
+_shared_models_lock = threading.Lock()
+
+def set_torch_threads(num_threads: int = TORCH_THREADS) -> None:
+    """Use num_threads intra-op threads and a single inter-op thread for torch inference."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Only allowed before torch starts any inter-op work; keep the existing pool
+        pass
+
+def reduced_precision_encode(model: "SentenceTransformer") -> Tuple[Callable, str]:
+    """
+    Run a SentenceTransformer at reduced precision where the hardware supports it.
+    
+    FP16 weights on CUDA; BF16 autocast on CPUs with AVX-512 BF16; FP32 otherwise or
+    when ADOBE_REDUCED_PRECISION=0.
+    
+    Args:
+        model: Loaded SentenceTransformer (converted in place on CUDA)
+        
+    Returns:
+        Tuple of (encode function, precision name) - include the name in cache keys
+    """
+    if os.getenv("ADOBE_REDUCED_PRECISION", "1") == "0":
+        return model.encode, "fp32"
+    
+    import torch
+    if model.device.type == "cuda":
+        model.half()
+        return model.encode, "fp16"
+    
+    is_bf16_supported = getattr(torch.cpu, "_is_avx512_bf16_supported", None)
+    if is_bf16_supported is not None and is_bf16_supported():
+        def encode(*args, **kwargs):
+            with torch.autocast(device_type="cpu", dtype=torch.bfloat16):
+                return model.encode(*args, **kwargs)
+        return encode, "bf16"
+    return model.encode, "fp32"
+
 class SemanticEmbedder:
     """Handles semantic embedding of text using sentence transformers."""
     
@@ -17,39 +116,135 @@ class SemanticEmbedder:
         """
         Initialize the semantic embedder with a local model.
         
+        The model (and torch/sentence-transformers with it) is loaded on first use, so
+        callers can construct the embedder early and overlap the load with other work.
+        
         Args:
             model_path: Path to the locally saved sentence transformer model
         """
         self.model_path = model_path
         self.model = None
+        self.backend = None
         self.model_info = {}
-        self._load_model()
+        self.embedding_cache = None
+        self.batch_size = _CPU_BATCH_SIZE
+        self._load_lock = threading.Lock()
+    
+    def _ensure_model(self):
+        """Load the model on first use; safe to call from several threads."""
+        if self.model is None:
+            with self._load_lock:
+                if self.model is None:
+                    self._load_model()
     
     def _load_model(self):
-        """Load the sentence transformer model from local path."""
+        """Load the sentence transformer model from local path, or reuse it if already loaded."""
         try:
-            print(f"Loading model from: {self.model_path}")
-            start_time = time.time()
-            
-            # Load model with local_files_only=True to ensure offline operation
-            self.model = SentenceTransformer(self.model_path, local_files_only=True)
-            
-            load_time = time.time() - start_time
-            print(f"✅ Model loaded successfully in {load_time:.2f} seconds")
+            key = os.path.abspath(self.model_path)
+            with _shared_models_lock:
+                shared = _shared_models.get(key)
+                if shared is None:
+                    shared = _shared_models[key] = self._build_model()
+                else:
+                    logger.info("♻️  Reusing model already loaded from: %s", self.model_path)
+            model, self.backend, self.batch_size = shared
             
             # Get model information
             self.model_info = {
-                'max_seq_length': self.model.max_seq_length,
-                'embedding_dimension': self.model.get_sentence_embedding_dimension(),
+                'max_seq_length': model.max_seq_length,
+                'embedding_dimension': model.get_sentence_embedding_dimension(),
                 'model_name': os.path.basename(self.model_path)
             }
             
-            print(f"📊 Model Info: {self.model_info}")
+            logger.info("📊 Model Info: %s", self.model_info)
+            
+            # Embeddings persist across runs per distinct text, keyed by this model and backend
+            # (and marked as unit-length, unlike entries written before normalization)
+            self.embedding_cache = EmbeddingCache(
+                f"{key}:{self.model_info['embedding_dimension']}:"
+                f"{self.backend}:normalized")
+            
+            # Published last: other threads treat a set model as fully loaded
+            self.model = model
             
         except Exception as e:
-            print(f"❌ Error loading model: {e}")
+            logger.error("❌ Error loading model: %s", e)
             raise
     
+    def _build_model(self) -> Tuple[Any, str, int]:
+        """Load the model from disk, returning (model, backend name, encode batch size)."""
+        logger.info("Loading model from: %s", self.model_path)
+        start_time = time.time()
+        batch_size = _CPU_BATCH_SIZE
+        
+        # Prefer the int8 ONNX export written by download_model.py; fall back to PyTorch
+        model = load_onnx_encoder(self.model_path)
+        if model is not None:
+            backend = "onnx-int8"
+        else:
+            set_torch_threads()
+            from sentence_transformers import SentenceTransformer
+            
+            # Load model with local_files_only=True to ensure offline operation
+            model = SentenceTransformer(self.model_path, local_files_only=True)
+            backend = "torch"
+            if model.device.type == "cuda":
+                batch_size = _CUDA_BATCH_SIZE
+            self._run_in_inference_mode(model)
+            if EMBED_WORKERS > 1:
+                self._serialize_tokenizer(model)
+        
+        load_time = time.time() - start_time
+        logger.info("✅ Model loaded successfully (%s) in %.2f seconds", backend, load_time)
+        return model, backend, batch_size
+    
+    def _run_in_inference_mode(self, model):
+        """Run model's encode() under torch.inference_mode, skipping all autograd bookkeeping."""
+        import torch
+        encode = model.encode
+        
+        def encode_for_inference(*args, **kwargs):
+            with torch.inference_mode():
+                return encode(*args, **kwargs)
+        model.encode = encode_for_inference
+    
+    def _serialize_tokenizer(self, model):
+        """Let concurrent encode() calls overlap model's forward passes but not tokenization."""
+        # Fast tokenizers raise "Already borrowed" when one instance is used by several threads
+        tokenize = model.tokenize
+        lock = threading.Lock()
+        
+        def locked_tokenize(texts):
+            with lock:
+                return tokenize(texts)
+        model.tokenize = locked_tokenize
+    
+    def _encode(self, texts: List[str], **encode_kwargs) -> np.ndarray:
+        """
+        Encode texts, splitting large inputs across EMBED_WORKERS concurrent encode() calls.
+        
+        PyTorch and ONNX Runtime release the GIL during inference, so threads sharing the one
+        loaded model run in parallel without a per-process copy of it.
+        """
+        if EMBED_WORKERS == 1 or len(texts) <= _PARALLEL_ENCODE_MIN_TEXTS:
+            return self.model.encode(texts, **encode_kwargs)
+        
+        # One progress bar per worker would interleave on the terminal
+        encode_kwargs['show_progress_bar'] = False
+        bounds = np.linspace(0, len(texts), EMBED_WORKERS + 1).astype(int)
+        # Only the split calls share torch's intra-op threads; single calls keep all of them
+        narrow_threads = self.backend == "torch"
+        if narrow_threads:
+            set_torch_threads(max(1, TORCH_THREADS // EMBED_WORKERS))
+        try:
+            with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as executor:
+                parts = list(executor.map(lambda bound: self.model.encode(texts[bound[0]:bound[1]], **encode_kwargs),
+                                          zip(bounds[:-1], bounds[1:])))
+        finally:
+            if narrow_threads:
+                set_torch_threads()
+        return np.concatenate([np.asarray(part, dtype=np.float32) for part in parts])
+    
     def create_query_embedding(self, persona_text: str, jbtd_text: str) -> np.ndarray:
         """
         Create a unified query embedding from persona and job-to-be-done.
@@ -59,145 +254,163 @@ class SemanticEmbedder:
             jbtd_text: The job-to-be-done description
             
         Returns:
-            Query embedding vector
+            Unit-length query embedding vector
         """
+        self._ensure_model()
+        
         # Combine persona and JBTD into a unified query
         query_text = f"As a {persona_text}, my primary objective is to {jbtd_text}."
         
-        print(f"🔍 Creating query embedding for: {query_text[:100]}...")
+        logger.info("🔍 Creating query embedding for: %.100s...", query_text)
         
         try:
-            # Encode the query
-            query_embedding = self.model.encode(query_text, convert_to_numpy=True)
-            print(f"✅ Query embedding created: {query_embedding.shape}")
+            # Encode the query (cached per query text)
+            query_embedding = self.embedding_cache.cached_encode(
+                self.model.encode, [query_text], convert_to_numpy=True, normalize_embeddings=True)[0]
+            logger.info("✅ Query embedding created: %s", query_embedding.shape)
             return query_embedding
             
         except Exception as e:
-            print(f"❌ Error creating query embedding: {e}")
+            logger.error("❌ Error creating query embedding: %s", e)
             raise
     
-    def create_content_embeddings(self, sections: List[Dict[str, Any]], batch_size: int = 32) -> np.ndarray:
+    def create_content_embeddings(self, sections: List[Dict[str, Any]], batch_size: int = None) -> np.ndarray:
         """
         Create embeddings for all content sections in batches.
         
         Args:
             sections: List of section dictionaries with 'content_text' field
-            batch_size: Batch size for processing
+            batch_size: Batch size for processing (default: tuned for the model's device)
             
         Returns:
-            Matrix of content embeddings
+            Matrix of unit-length content embeddings
         """
         if not sections:
             return np.array([])
         
+        self._ensure_model()
+        
         # Extract content texts
         content_texts = [section['content_text'] for section in sections]
         
-        print(f"📚 Creating embeddings for {len(content_texts)} sections...")
+        logger.info("📚 Creating embeddings for %s sections...", len(content_texts))
         start_time = time.time()
         
         try:
-            # Encode all content in batches
-            content_embeddings = self.model.encode(
+            # Encode all content not already cached, in batches
+            content_embeddings = self.embedding_cache.cached_encode(
+                self._encode,
                 content_texts, 
-                batch_size=batch_size,
+                batch_size=batch_size or self.batch_size,
                 convert_to_numpy=True,
-                show_progress_bar=True
+                normalize_embeddings=True,
+                show_progress_bar=SHOW_PROGRESS
             )
             
             processing_time = time.time() - start_time
-            print(f"✅ Content embeddings created in {processing_time:.2f} seconds")
-            print(f"📊 Embedding matrix shape: {content_embeddings.shape}")
+            logger.info("✅ Content embeddings created in %.2f seconds", processing_time)
+            logger.info("📊 Embedding matrix shape: %s", content_embeddings.shape)
             
             return content_embeddings
             
         except Exception as e:
-            print(f"❌ Error creating content embeddings: {e}")
+            logger.error("❌ Error creating content embeddings: %s", e)
             raise
     
-    def create_chunk_embeddings(self, chunks: List[str], batch_size: int = 32) -> np.ndarray:
+    def create_chunk_embeddings(self, chunks: List[str], batch_size: int = None) -> np.ndarray:
         """
         Create embeddings for text chunks (for sub-section analysis).
         
         Args:
             chunks: List of text chunks
-            batch_size: Batch size for processing
+            batch_size: Batch size for processing (default: tuned for the model's device)
             
         Returns:
-            Matrix of chunk embeddings
+            Matrix of unit-length chunk embeddings
         """
         if not chunks:
             return np.array([])
         
-        print(f"🔍 Creating embeddings for {len(chunks)} chunks...")
+        self._ensure_model()
+        logger.info("🔍 Creating embeddings for %s chunks...", len(chunks))
         start_time = time.time()
         
         try:
-            # Encode all chunks in batches
-            chunk_embeddings = self.model.encode(
+            # Encode all chunks not already cached, in batches
+            chunk_embeddings = self.embedding_cache.cached_encode(
+                self._encode,
                 chunks, 
-                batch_size=batch_size,
+                batch_size=batch_size or self.batch_size,
                 convert_to_numpy=True,
-                show_progress_bar=True
+                normalize_embeddings=True,
+                show_progress_bar=SHOW_PROGRESS
             )
             
             processing_time = time.time() - start_time
-            print(f"✅ Chunk embeddings created in {processing_time:.2f} seconds")
-            print(f"📊 Chunk embedding matrix shape: {chunk_embeddings.shape}")
+            logger.info("✅ Chunk embeddings created in %.2f seconds", processing_time)
+            logger.info("📊 Chunk embedding matrix shape: %s", chunk_embeddings.shape)
             
             return chunk_embeddings
             
         except Exception as e:
-            print(f"❌ Error creating chunk embeddings: {e}")
+            logger.error("❌ Error creating chunk embeddings: %s", e)
             raise
     
     def compute_cosine_similarities(self, query_embedding: np.ndarray, content_embeddings: np.ndarray) -> np.ndarray:
         """
         Compute cosine similarities between query and all content embeddings.
         
+        Assumes pre-normalized inputs (as produced by the create_*_embedding methods),
+        so for float matrices the cosine is a plain dot product.
+        
         Args:
-            query_embedding: Single query embedding vector
-            content_embeddings: Matrix of content embeddings
+            query_embedding: Single unit-length query embedding vector
+            content_embeddings: Matrix of unit-length content embeddings, or an (int8 matrix,
+                scales) pair from quantize_int8
             
         Returns:
             Array of cosine similarity scores
         """
-        if content_embeddings.size == 0:
+        quantized = isinstance(content_embeddings, tuple)
+        if quantized:
+            # The per-row scale cancels out of the cosine, so the int8 rows are used as-is
+            # against the float32 query
+            content_embeddings = content_embeddings[0]
+        
+        if len(content_embeddings) == 0:
             return np.array([])
         
-        print("🧮 Computing cosine similarities...")
+        logger.info("🧮 Computing cosine similarities...")
         start_time = time.time()
         
         try:
-            # Normalize vectors for cosine similarity
-            query_norm = np.linalg.norm(query_embedding)
-            content_norms = np.linalg.norm(content_embeddings, axis=1)
-            
-            # Compute dot products
-            dot_products = np.dot(content_embeddings, query_embedding)
-            
-            # Compute cosine similarities
-            similarities = dot_products / (content_norms * query_norm)
-            
-            # Handle any NaN values (shouldn't occur with normalized vectors)
-            similarities = np.nan_to_num(similarities, nan=0.0)
+            if quantized:
+                # Rounding leaves int8 rows off unit length, so their norms are still divided
+                # out (numba kernel when available)
+                similarities = cosine_batch(content_embeddings, query_embedding)
+            else:
+                # Unit-length rows and query: the cosine is a single matrix-vector product
+                similarities = (np.asarray(content_embeddings, dtype=np.float32)
+                                @ np.asarray(query_embedding, dtype=np.float32))
             
             computation_time = time.time() - start_time
-            print(f"✅ Similarities computed in {computation_time:.4f} seconds")
-            print(f"📊 Similarity scores range: {similarities.min():.4f} to {similarities.max():.4f}")
+            logger.info("✅ Similarities computed in %.4f seconds", computation_time)
             
             return similarities
             
         except Exception as e:
-            print(f"❌ Error computing similarities: {e}")
+            logger.error("❌ Error computing similarities: %s", e)
             raise
     
     def get_model_info(self) -> Dict[str, Any]:
-        """Get information about the loaded model."""
+        """Get information about the loaded model (loading it if needed)."""
+        self._ensure_model()
         return self.model_info.copy()
 
 def main():
     """Test the semantic embedder."""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
     embedder = SemanticEmbedder()
     
     # Test with sample data
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Content Segmenter
+Checks section boundaries on small PDFs rendered with PyMuPDF.
+"""
+
+import os
+import tempfile
+import fitz
+from content_segmenter import ContentSegmenter
+
+def test_same_page_sections():
+    """Two headings on one page: each section holds only the text between them."""
+    print("🧪 Testing sections that share a page...")
+
+    with tempfile.TemporaryDirectory(prefix="test_segmenter_") as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "same_page.pdf")
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 72), "Overview", fontsize=14, fontname='hebo')
+        page.insert_text((72, 100), "First section body text.", fontsize=10, fontname='helv')
+        page.insert_text((72, 160), "Appendix", fontsize=14, fontname='hebo')
+        page.insert_text((72, 188), "Second section body text.", fontsize=10, fontname='helv')
+        doc.save(pdf_path)
+        doc.close()
+
+        outline = [
+            {"level": "H1", "text": "Overview", "page": 0},
+            {"level": "H1", "text": "Appendix", "page": 0}
+        ]
+        with fitz.open(pdf_path) as doc:
+            sections = ContentSegmenter().extract_section_content(doc, outline)
+
+    contents = {section['heading_text']: section['content_text'] for section in sections}
+    assert set(contents) == {"Overview", "Appendix"}, contents
+    # Blocks overlapping a boundary may carry the heading lines, but no text is read twice
+    assert contents["Overview"].count("First section body text.") == 1, contents
+    assert "Second section" not in contents["Overview"], contents
+    assert contents["Appendix"].count("Second section body text.") == 1, contents
+    assert "First section" not in contents["Appendix"], contents
+    print("✅ Same-page sections: PASSED")
+
+if __name__ == "__main__":
+    test_same_page_sections()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Shared Fixtures for the Round 1B Test Scripts
+Generated input directories and the pipeline instance used by every test script.
+"""
+
+import os
+import atexit
+import hashlib
+import tempfile
+import shutil
+import textwrap
+import threading
+from functools import lru_cache
+from main_round1b import PersonaDrivenDocumentIntelligence, configure_logging
+
+# Test scratch space: tmpfs when the system has a writable one, else the default temp dir
+SCRATCH_DIR = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+
+# This process's scratch directory, created by the first scratch_root() call
+_scratch_root = None
+_scratch_root_lock = threading.Lock()
+
+def scratch_root() -> str:
+    """
+    Create this process's scratch directory under SCRATCH_DIR and schedule its removal at exit.
+    
+    Generated inputs and test output directories all live here. Every test process gets
+    its own root, so one process exiting never removes files another is still using.
+    """
+    global _scratch_root
+    # Created on first use rather than at import, so the pipeline's spawned pool workers
+    # (which re-import the test scripts) never create or remove a root of their own;
+    # locked, since the sample cases build their inputs from concurrent threads
+    with _scratch_root_lock:
+        if _scratch_root is None:
+            _scratch_root = tempfile.mkdtemp(prefix="r1b_", dir=SCRATCH_DIR)
+            atexit.register(shutil.rmtree, _scratch_root, ignore_errors=True)
+    return _scratch_root
+
+def write_minimal_pdf(path: str, text: str) -> None:
+    """
+    Render plain text as a real PDF with PyMuPDF, so fixtures exercise the actual parser.
+    
+    Blocks are separated by blank lines. The first block is set as the title, and the
+    first line of every later block as a bold heading when it is short; everything else
+    is wrapped body text.
+    """
+    import fitz
+    
+    blocks = [[line.strip() for line in block.strip().splitlines()]
+              for block in text.strip().split('\n\n')]
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 72
+    
+    def put(line, fontsize, fontname):
+        nonlocal page, y
+        if y > page.rect.height - 72:
+            page = doc.new_page()
+            y = 72
+        page.insert_text((72, y), line, fontsize=fontsize, fontname=fontname)
+        y += fontsize * 1.4
+    
+    for i, block in enumerate(block for block in blocks if any(block)):
+        lines = [line for line in block if line]
+        if i == 0:
+            put(lines.pop(0), 18, 'hebo')
+        elif len(lines[0]) < 60:
+            put(lines.pop(0), 14, 'hebo')
+        for line in textwrap.wrap(' '.join(lines), 90):
+            put(line, 10, 'helv')
+        y += 10
+    doc.save(path)
+    doc.close()
+
+@lru_cache(maxsize=None)
+def build_case(files: tuple) -> str:
+    """
+    Write an input directory once per distinct set of files and return its path.
+    
+    Args:
+        files: Tuple of (filename, content) pairs; .pdf contents are rendered with
+            write_minimal_pdf, everything else is written as text
+        
+    Returns:
+        Directory under scratch_root() named by the hash of files; tests only read from it
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for name, content in files:
+        digest.update(name.encode('utf-8') + b'\0' + content.encode('utf-8') + b'\0')
+    case_dir = os.path.join(scratch_root(), digest.hexdigest())
+    
+    if not os.path.isdir(case_dir):
+        # Written aside and renamed into place, so a half-written case is never reused
+        staging_dir = tempfile.mkdtemp(dir=scratch_root())
+        for name, content in files:
+            if name.lower().endswith('.pdf'):
+                write_minimal_pdf(os.path.join(staging_dir, name), content)
+                continue
+            with open(os.path.join(staging_dir, name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        try:
+            os.rename(staging_dir, case_dir)
+        except OSError:
+            # Another thread wrote the same case first
+            shutil.rmtree(staging_dir, ignore_errors=True)
+    
+    return case_dir
+
+@lru_cache(maxsize=None)
+def get_system() -> PersonaDrivenDocumentIntelligence:
+    """Pipeline instance shared by all tests, so the model and caches load once."""
+    # Tests print the pipeline's progress messages like the command line does
+    configure_logging()
+    system = PersonaDrivenDocumentIntelligence()
+    # Flush queued outline writes and stop the writer thread before the process exits
+    atexit.register(system.close)
+    return system
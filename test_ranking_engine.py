@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test Script for the Ranking Engine
+Checks sub-section chunk selection without loading the embedding model.
+"""
+
+import numpy as np
+from ranking_engine import RankingEngine
+
+FOOTER = "For more information contact the editorial office at the address on the back cover."
+
+class KeywordEmbedder:
+    """Stand-in embedder: a chunk's vector marks whether it mentions the footer text."""
+
+    def create_chunk_embeddings(self, chunks):
+        return np.array([[1.0, 0.0] if "editorial office" in chunk else [0.0, 1.0] for chunk in chunks],
+                        dtype=np.float32)
+
+def make_sections():
+    """Three sections sharing the footer paragraph; the last one holds nothing else."""
+    body = "Section {} discusses a distinct topic in enough detail to count as a chunk."
+    return [
+        {'doc_name': 'a.pdf', 'page_num': 1, 'content_text': f"{body.format(1)}\n\n{FOOTER}"},
+        {'doc_name': 'b.pdf', 'page_num': 2, 'content_text': f"{body.format(2)}\n\n{FOOTER}"},
+        {'doc_name': 'c.pdf', 'page_num': 3, 'content_text': FOOTER}
+    ]
+
+def test_drop_boilerplate():
+    """Repeated chunks are removed, except from a section made only of them."""
+    print("🧪 Testing boilerplate removal...")
+
+    engine = RankingEngine(KeywordEmbedder())
+    section_chunks = [engine.chunk_text(section['content_text']) for section in make_sections()]
+    filtered = engine._drop_boilerplate(section_chunks)
+
+    assert [FOOTER in chunks for chunks in filtered] == [False, False, True], filtered
+    assert filtered[2] == [FOOTER], filtered
+    print("✅ Boilerplate removal: PASSED")
+
+def test_boilerplate_kept_by_default():
+    """Without drop_boilerplate, a repeated chunk can still be the refined text."""
+    print("🧪 Testing sub-section analysis with and without boilerplate removal...")
+
+    # The query matches the footer best
+    query = np.array([1.0, 0.0], dtype=np.float32)
+
+    results = RankingEngine(KeywordEmbedder()).analyze_sub_sections(make_sections(), query)
+    assert [result['refined_text'] for result in results] == [FOOTER] * 3, results
+
+    results = RankingEngine(KeywordEmbedder(), drop_boilerplate=True).analyze_sub_sections(make_sections(), query)
+    refined = [result['refined_text'] for result in results]
+    assert FOOTER not in refined[:2] and refined[2] == FOOTER, results
+    print("✅ Boilerplate default: PASSED")
+
+if __name__ == "__main__":
+    test_drop_boilerplate()
+    test_boilerplate_kept_by_default()
@@ -5,27 +5,23 @@ Tests the complete persona-driven document intelligence pipeline.
 """
 
 import os
-import json
 import tempfile
-import shutil
-from main_round1b import PersonaDrivenDocumentIntelligence
+from main_round1b import write_json
+from test_helpers import build_case, get_system, scratch_root
 
-def create_test_files():
-    """Create test files for the system."""
-    
-    # Create temporary directories
-    test_input_dir = tempfile.mkdtemp(prefix="test_input_")
-    test_output_dir = tempfile.mkdtemp(prefix="test_output_")
+def create_test_files(test_output_dir: str) -> str:
+    """
+    Create test files for the system.
     
-    # Create persona file
+    Args:
+        test_output_dir: Fresh directory the test writes to; the sample outline goes here
+        
+    Returns:
+        Shared input directory holding the persona, job-to-be-done and sample PDF
+    """
+    # Persona and job-to-be-done
     persona_content = "investment analyst specializing in technology sector"
-    with open(os.path.join(test_input_dir, "persona.txt"), 'w') as f:
-        f.write(persona_content)
-    
-    # Create job-to-be-done file
     jbtd_content = "analyze market trends and identify investment opportunities in emerging technologies"
-    with open(os.path.join(test_input_dir, "job_to_be_done.txt"), 'w') as f:
-        f.write(jbtd_content)
     
     # Create a sample PDF outline (simulating Round 1A output)
     sample_outline = {
@@ -60,11 +56,9 @@ def create_test_files():
     }
     
     # Save the outline
-    with open(os.path.join(test_output_dir, "sample.pdf.json"), 'w') as f:
-        json.dump(sample_outline, f, indent=2)
+    write_json(os.path.join(test_output_dir, "sample.pdf.json"), sample_outline)
     
-    # Create a sample PDF file (we'll use a text file as a placeholder)
-    # In a real scenario, this would be a PDF file
+    # Create a sample PDF file (rendered from this text by build_case)
     sample_pdf_content = """
     Technology Market Analysis
     
@@ -83,10 +77,10 @@ def create_test_files():
     Cloud computing infrastructure and services continue to expand rapidly. The shift toward hybrid and multi-cloud environments creates opportunities for companies providing cloud security, management tools, and specialized services.
     """
     
-    with open(os.path.join(test_input_dir, "sample.pdf"), 'w') as f:
-        f.write(sample_pdf_content)
+    test_input_dir = build_case((("persona.txt", persona_content), ("job_to_be_done.txt", jbtd_content),
+                                 ("sample.pdf", sample_pdf_content)))
     
-    return test_input_dir, test_output_dir
+    return test_input_dir
 
 def test_system():
     """Test the complete system."""
@@ -94,68 +88,66 @@ def test_system():
     print("🧪 Testing Persona-Driven Document Intelligence System...")
     
     try:
-        # Create test files
-        test_input_dir, test_output_dir = create_test_files()
-        
-        print(f"📁 Test directories created:")
-        print(f"   Input: {test_input_dir}")
-        print(f"   Output: {test_output_dir}")
-        
-        # Initialize the system
-        print("🚀 Initializing system...")
-        system = PersonaDrivenDocumentIntelligence()
-        
-        # Test individual components
-        print("🔍 Testing individual components...")
-        
-        # Test reading input files
-        input_data = system.read_input_files(test_input_dir)
-        print(f"✅ Input files read: {input_data}")
-        
-        # Test document processing (this will fail without actual PDFs, but we can test the structure)
-        print("📚 Testing document processing structure...")
-        pdf_files = [f for f in os.listdir(test_input_dir) if f.lower().endswith('.pdf')]
-        print(f"✅ Found {len(pdf_files)} PDF files")
-        
-        # Test the complete pipeline structure
-        print("🎯 Testing pipeline structure...")
-        
-        # Create a minimal test output
-        test_output = {
-            "metadata": {
-                "input_documents": pdf_files,
-                "persona": input_data['persona'],
-                "job_to_be_done": input_data['jbtd'],
-                "processing_timestamp": "2025-01-27T12:00:00",
-                "model_info": system.semantic_embedder.get_model_info()
-            },
-            "extracted_section": [
-                {
-                    "document_name": "sample.pdf",
-                    "page_number": 1,
-                    "section_title": "Market Overview",
-                    "importance_rank": 1
-                }
-            ],
-            "sub-section_analysis": [
-                {
-                    "document_name": "sample.pdf",
-                    "page_number": 1,
-                    "refined_text": "The global technology market has experienced unprecedented growth in recent years, with particular strength in artificial intelligence, cloud computing, and cybersecurity."
-                }
-            ]
-        }
-        
-        # Save test output
-        output_path = os.path.join(test_output_dir, "test_output.json")
-        with open(output_path, 'w') as f:
-            json.dump(test_output, f, indent=2)
-        
-        print(f"✅ Test output saved to: {output_path}")
-        
-        # Clean up
-        shutil.rmtree(test_input_dir)
-        shutil.rmtree(test_output_dir)
+        # The output directory is written to by the test, so it is fresh every time and
+        # removed on exit even when a step fails (the shared input directory goes at exit)
+        with tempfile.TemporaryDirectory(prefix="test_output_", dir=scratch_root()) as test_output_dir:
+            # Create test files
+            test_input_dir = create_test_files(test_output_dir)
+            
+            print(f"📁 Test directories created:")
+            print(f"   Input: {test_input_dir}")
+            print(f"   Output: {test_output_dir}")
+            
+            # Initialize the system
+            print("🚀 Initializing system...")
+            system = get_system()
+            
+            # Test individual components
+            print("🔍 Testing individual components...")
+            
+            # Test reading input files
+            input_data = system.read_input_files(test_input_dir)
+            print(f"✅ Input files read: {input_data}")
+            
+            # Test document processing (this will fail without actual PDFs, but we can test the structure)
+            print("📚 Testing document processing structure...")
+            pdf_files = [f for f in os.listdir(test_input_dir) if f.lower().endswith('.pdf')]
+            print(f"✅ Found {len(pdf_files)} PDF files")
+            
+            # Test the complete pipeline structure
+            print("🎯 Testing pipeline structure...")
+            
+            # Create a minimal test output
+            test_output = {
+                "metadata": {
+                    "input_documents": pdf_files,
+                    "persona": input_data['persona'],
+                    "job_to_be_done": input_data['jbtd'],
+                    "processing_timestamp": "2025-01-27T12:00:00",
+                    "model_info": system.semantic_embedder.get_model_info()
+                },
+                "extracted_section": [
+                    {
+                        "document_name": "sample.pdf",
+                        "page_number": 1,
+                        "section_title": "Market Overview",
+                        "importance_rank": 1
+                    }
+                ],
+                "sub-section_analysis": [
+                    {
+                        "document_name": "sample.pdf",
+                        "page_number": 1,
+                        "refined_text": "The global technology market has experienced unprecedented growth in recent years, with particular strength in artificial intelligence, cloud computing, and cybersecurity."
+                    }
+                ]
+            }
+            
+            # Save test output
+            output_path = os.path.join(test_output_dir, "test_output.json")
+            write_json(output_path, test_output)
+            
+            print(f"✅ Test output saved to: {output_path}")
         
         print("🎉 System test completed successfully!")
         return True
@@ -170,10 +162,10 @@ def test_model_loading():
     print("🧠 Testing model loading...")
     
     try:
-        from semantic_embedder import SemanticEmbedder
-        
-        # Try to load the model
-        embedder = SemanticEmbedder()
+        # Try to load the model (loaded on first use); the embedder is the shared
+        # pipeline's, so the system test reuses the weights loaded here
+        embedder = get_system().semantic_embedder
+        model_info = embedder.get_model_info()
         
         # Test basic functionality
         test_text = "This is a test sentence for embedding."
@@ -181,7 +173,7 @@ def test_model_loading():
         
         print(f"✅ Model loaded successfully!")
         print(f"📊 Embedding dimension: {embedding.shape}")
-        print(f"📊 Model info: {embedder.get_model_info()}")
+        print(f"📊 Model info: {model_info}")
         
         return True
         